@@ -0,0 +1,142 @@
+"""
+Microbenchmark of the json codecs on the payloads of a crawl.
+
+    python -m benchmarks.codec [--number 2000]
+
+Times, per codec, the decoding of a search page and of a job detail, the
+encoding of their archive records and the rendering of an api response.
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from fastapi.encoders import jsonable_encoder
+
+from interface.backend.codec import CODECS, JsonCodec, orjson
+
+
+def search_page(rows: int = 20) -> dict[str, Any]:
+    return {
+        "num_pages": 50,
+        "current_page": 1,
+        "total_hits": 1000,
+        "normalized_search_query": "python",
+        "documents": [
+            {
+                "job_id": f"{i:08d}-aaaa-bbbb-cccc-dddddddddddd",
+                "title": f"Senior Python Developer (m/w/d) {i}",
+                "publication_date": "2024-01-15T08:30:00+01:00",
+                "company_name": "Example AG",
+                "place": "Zürich",
+                "is_active": True,
+                "preview": "Wir suchen eine erfahrene Persönlichkeit " * 5,
+                "company_logo_file": "https://example.com/logo.png",
+                "slug": "senior-python-developer",
+                "company_slug": "example-ag",
+                "company_id": 1234 + i,
+                "company_segmentation": "enterprise",
+                "employment_position_ids": [1, 2],
+                "employment_grades": [80, 100],
+                "is_paid": i % 2 == 0,
+                "work_experience": ["senior"],
+                "language_skills": [{"language": "de", "level": 4}],
+                "_links": {
+                    lang: {"href": f"https://www.jobs.ch/{lang}/vacancies/detail/{i}/"}
+                    for lang in ("detail_en", "detail_de", "detail_fr")
+                },
+            }
+            for i in range(rows)
+        ],
+    }
+
+
+def job_detail() -> dict[str, Any]:
+    return {
+        "application_url": "https://example.com/apply",
+        "external_url": "",
+        "template": "default",
+        "template_profession": "Software Engineering",
+        "template_text": "<p>Ihre Aufgaben: Entwicklung & Betrieb</p>" * 120,
+        "template_lead_text": "<p>Über uns</p>" * 10,
+        "is_active": True,
+        "is_paid": True,
+        "headhunter_application_allowed": False,
+        "publication_end_date": "2024-02-15T08:30:00+01:00",
+        "contact_person": {"name": "Jane Doe", "phone": "+41 44 000 00 00"},
+    }
+
+
+def api_rows(rows: int = 20) -> dict[str, Any]:
+    now: datetime = datetime.now(timezone.utc)
+    return {
+        "data": [
+            {
+                key: value
+                for key, value in doc.items()
+                if not isinstance(value, (dict, list))
+            }
+            | {"id": idx, "created_at": now, "updated_at": now}
+            for idx, doc in enumerate(search_page(rows)["documents"])
+        ]
+    }
+
+
+def stdlib_api_response(content: dict[str, Any]) -> bytes:
+    # what JSONResponse(content=jsonable_encoder(d)) renders
+    return json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode()
+
+
+def timed(func: Callable[[], Any], number: int) -> float:
+    """Best of 3, in microseconds per call."""
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e6
+
+
+def bench(codec: JsonCodec, number: int) -> dict[str, float]:
+    page: dict[str, Any] = search_page()
+    detail: dict[str, Any] = job_detail()
+    page_bytes: bytes = json.dumps(page).encode()
+    detail_bytes: bytes = json.dumps(detail).encode()
+    rows: dict[str, Any] = api_rows()
+    record: dict[str, Any] = {"key": "sub_requests/1/1", "data": page}
+
+    api: Callable[[], bytes] = (
+        (lambda: codec.dumps(rows, default=jsonable_encoder))
+        if codec.name != "json"
+        else (lambda: stdlib_api_response(rows))
+    )
+    return {
+        "decode page": timed(lambda: codec.loads(page_bytes), number),
+        "decode detail": timed(lambda: codec.loads(detail_bytes), number),
+        "archive page": timed(lambda: codec.dumps(record), number),
+        "api response": timed(api, number),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    names: list[str] = [name for name in CODECS if name != "orjson" or orjson]
+    results: dict[str, dict[str, float]] = {
+        name: bench(CODECS[name](), args.number) for name in names
+    }
+
+    print(f"{'us / call':<16}" + "".join(f"{name:>12}" for name in names), end="")
+    print(f"{'speedup':>12}" if len(names) > 1 else "")
+    for case in results["json"]:
+        times: list[float] = [results[name][case] for name in names]
+        print(f"{case:<16}" + "".join(f"{t:>12.1f}" for t in times), end="")
+        print(f"{times[0] / times[-1]:>11.1f}x" if len(names) > 1 else "")
+
+
+if __name__ == "__main__":
+    main()
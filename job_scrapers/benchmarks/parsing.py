@@ -0,0 +1,126 @@
+"""
+Microbenchmark of the html parsers on the pages of an html scraper.
+
+    python -m benchmarks.parsing [--number 200]
+
+Times the old soup() (html.parser tree plus the temp.html dump) against the
+extraction of a few fields with parsing.select and the text of a job
+template_text with parsing.html_text, for every installed parser, after
+checking that every parser extracts the same fields as a full bs4 tree.
+"""
+import argparse
+import tempfile
+import timeit
+from pathlib import Path
+from typing import Any, Callable
+
+from bs4 import BeautifulSoup
+
+from interface.backend.scrapers.base import parsing
+from interface.backend.scrapers.base.utils import write_to_file
+
+SELECTORS: dict[str, str] = {
+    "title": "h1.job-title",
+    "company": "div.company span.name",
+    "place": "span.place",
+    "published": "time",
+}
+
+
+def vacancy_page(rows: int = 40) -> str:
+    """A job page with the usual navigation, scripts and similar jobs around it."""
+    head: str = "<head><title>Vacancy</title>" + "<script>var x = 1;</script>" * 20
+    nav: str = "<nav>" + "".join(f"<a href='/p/{i}'>Link {i}</a>" for i in range(80))
+    similar: str = "".join(
+        f"<li class='job'><a href='/job/{i}'>Job {i}</a><span class='place'>Bern</span></li>"
+        for i in range(rows)
+    )
+    return (
+        f"<html>{head}</head><body>{nav}</nav><main>"
+        "<h1 class='job-title'>Senior Python Developer</h1>"
+        "<div class='company'><span class='name'>Example AG</span></div>"
+        "<span class='place'>Zürich</span><time>2024-01-15</time>"
+        f"{template_text()}</main><ul>{similar}</ul></body></html>"
+    )
+
+
+# selectors whose matches depend on the nodes around them, with the text
+# the full tree gives for them
+SIBLINGS_PAGE: str = (
+    "<html><body><div><h1>Title</h1><p>first</p><span>x</span><p>second</p></div>"
+    "<section><span>y</span><span>z</span></section></body></html>"
+)
+CASES: dict[str, str | None] = {
+    "h1 + p": "first",
+    "h1 ~ span": "x",
+    "span, p": "first",
+    "p:first-child": None,
+    "p:last-child": "second",
+    "span:only-child": None,
+    "span:nth-child(2)": "z",
+    "span:nth-of-type(2)": "z",
+    "p:first-of-type": "first",
+    "p:last-of-type": "second",
+    "section span:only-of-type": None,
+    "div > h1": "Title",
+    "section span": "y",
+}
+
+
+def check(names: list[str]) -> None:
+    for name in names:
+        for selector, expected in CASES.items():
+            got = parsing.select(SIBLINGS_PAGE, {"field": selector}, name)["field"]
+            assert got == expected, f"{name}: {selector!r} gave {got!r}, not {expected!r}"
+        full: dict = {
+            field: (node := BeautifulSoup(vacancy_page(), "html.parser").select_one(s))
+            and node.get_text(strip=True)
+            for field, s in SELECTORS.items()
+        }
+        assert parsing.select(vacancy_page(), SELECTORS, name) == full, name
+
+
+def template_text() -> str:
+    return "<p>Ihre Aufgaben: <b>Entwicklung</b> &amp; Betrieb</p>" * 120
+
+
+def timed(func: Callable[[], Any], number: int) -> float:
+    """Best of 3, in microseconds per call."""
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e6
+
+
+def old_soup(html: str, path: Path) -> Any:
+    tree = BeautifulSoup(html, features="html.parser")
+    write_to_file(path, tree)
+    return {field: tree.select_one(selector) for field, selector in SELECTORS.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    page: str = vacancy_page()
+    text: str = template_text()
+    names: list[str] = [name for name in parsing.PARSERS if parsing.available(name)]
+    check(names)
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline: float = timed(lambda: old_soup(page, Path(tmp) / "temp.html"), args.number)
+    baseline_text: float = timed(
+        lambda: BeautifulSoup(text, features="html.parser").get_text(" ", strip=True),
+        args.number,
+    )
+
+    print(f"{'us / call':<24}{'time':>12}{'speedup':>12}")
+    print(f"{'soup + dump (old)':<24}{baseline:>12.1f}")
+    for name in names:
+        t: float = timed(lambda: parsing.select(page, SELECTORS, name), args.number)
+        print(f"{'select ' + name:<24}{t:>12.1f}{baseline / t:>11.1f}x")
+    print(f"{'template_text (old)':<24}{baseline_text:>12.1f}")
+    for name in names:
+        t = timed(lambda: parsing.html_text(text, parser=name), args.number)
+        print(f"{'html_text ' + name:<24}{t:>12.1f}{baseline_text / t:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Offline stand-in for the jobs.ch api, to crawl without touching the network.
+
+    python -m benchmarks.replay [--port 8765] [--hits 1000] [--latency 0.05]
+                                [--error-rate 0.01] [--max-rows 100]
+                                [--archive PATH]
+
+Serves search pages (honouring `rows` up to `max_rows`, `page`, the company
+segment and employment type facets and the publication dates) and job
+details in the shapes the jobsch scraper extracts. The jobs are synthetic, `hits` distinct
+ones per query, or replayed from a scraper archive
+(data/scraped/jobsch/archive) with --archive, the same for every query.
+Point the scraper to it with JOBSCH_API_URL=http://127.0.0.1:<port>/api/v1/public/
+"""
+import argparse
+import asyncio
+import math
+import random
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Optional
+
+from aiohttp import web
+
+from interface.backend.scrapers.base import SegmentArchive
+
+API_PREFIX: str = "/api/v1/public"
+
+SEGMENTS: tuple[str, ...] = ("kmu", "gu", "pdl")
+EMPLOYMENT_TYPES: tuple[str, ...] = ("1", "2", "3", "4", "5", "6")
+
+
+def synthetic_job(idx: int, query: str = "") -> dict[str, Any]:
+    job_id: str = f"{zlib.crc32(query.encode()):08x}-0000-4000-8000-{idx:012d}"
+    # one job every 2 hours, so that publication date windows select them
+    published: datetime = datetime.now() - timedelta(hours=2 * idx)
+    return {
+        "job_id": job_id,
+        "title": f"Software Engineer {idx}",
+        "publication_date": published.isoformat(),
+        "company_name": f"Company {idx % 97}",
+        "place": "Zürich",
+        "is_active": True,
+        "preview": "Wir suchen eine erfahrene Persönlichkeit " * 5,
+        "company_logo_file": "",
+        "slug": f"software-engineer-{idx}",
+        "company_slug": f"company-{idx % 97}",
+        "company_id": idx % 97,
+        "company_segmentation": SEGMENTS[idx % len(SEGMENTS)],
+        "employment_type_ids": [EMPLOYMENT_TYPES[idx % len(EMPLOYMENT_TYPES)]],
+        "employment_position_ids": [2],
+        "employment_grades": [80, 100],
+        "is_paid": idx % 3 == 0,
+        "work_experience": [],
+        "language_skills": [],
+        "_links": {
+            lang: {"href": f"https://www.jobs.ch/{lang[-2:]}/vacancies/detail/{job_id}/"}
+            for lang in ("detail_en", "detail_de", "detail_fr")
+        },
+    }
+
+
+def synthetic_detail(job: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "job_id": job["job_id"],
+        "application_url": f"https://example.com/apply/{job['job_id']}",
+        "external_url": "",
+        "template": "default",
+        "template_profession": "Software Engineering",
+        "template_text": "<p>Ihre Aufgaben: Entwicklung & Betrieb</p>" * 60,
+        "template_lead_text": "<p>Über uns</p>",
+        "is_active": True,
+        "is_paid": job["is_paid"],
+        "headhunter_application_allowed": False,
+        "publication_end_date": "",
+        "contact_person": {},
+    }
+
+
+def load_archive(path: Path) -> tuple[list[dict], dict[str, dict]]:
+    """Jobs of the archived search pages and the archived details, by job_id."""
+    jobs: dict[str, dict] = {}
+    details: dict[str, dict] = {}
+    with SegmentArchive(path) as archive:
+        for key, data in archive:
+            if key.startswith("jobs/"):
+                details[key.split("/", 1)[1]] = data
+            elif isinstance(data, dict):
+                for job in data.get("documents", []):
+                    jobs[job["job_id"]] = job
+    return list(jobs.values()), details
+
+
+class ReplayServer:
+    """
+    Fake jobs.ch search api, with a delay and a 503 rate on every response.
+
+    ================================================================
+
+    Args:
+        jobs (Optional[list[dict]]): Search documents served for every query,
+            newest first. When None, `hits` synthetic jobs per query.
+
+        details (dict[str, dict]): Job details by job_id, synthetic when missing.
+
+        latency (float): Mean response delay in seconds (exponentially distributed).
+
+        error_rate (float): Share of the requests answered with a 503.
+
+        hits (int): Synthetic jobs per query.
+
+        max_rows (int): Largest page served, larger `rows` are cut to it.
+    """
+
+    def __init__(
+        self,
+        jobs: Optional[list[dict]] = None,
+        details: Optional[dict[str, dict]] = None,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        hits: int = 1000,
+        max_rows: int = 100,
+    ) -> None:
+        self.max_rows: int = max_rows
+        self.jobs: Optional[list[dict]] = jobs
+        self.jobs_by_query: dict[str, list[dict]] = {}
+        self.jobs_by_id: dict[str, dict] = {job["job_id"]: job for job in jobs or []}
+        self.hits: int = hits
+        self.details: dict[str, dict] = details or {}
+        self.latency: float = latency
+        self.error_rate: float = error_rate
+        self.counts: Counter = Counter()
+
+    def query_jobs(self, query: str) -> list[dict]:
+        if self.jobs is not None:
+            return self.jobs
+        if query not in self.jobs_by_query:
+            jobs: list[dict] = [synthetic_job(idx, query) for idx in range(self.hits)]
+            self.jobs_by_query[query] = jobs
+            self.jobs_by_id.update((job["job_id"], job) for job in jobs)
+        return self.jobs_by_query[query]
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get(f"{API_PREFIX}/search", self.search)
+        app.router.add_get(f"{API_PREFIX}/search/job/{{job_id}}", self.job)
+        app.router.add_get("/counts", self.stats)
+        return app
+
+    async def respond(self, kind: str) -> Optional[web.Response]:
+        self.counts[kind] += 1
+        if self.latency:
+            await asyncio.sleep(random.expovariate(1 / self.latency))
+        if random.random() < self.error_rate:
+            self.counts["503"] += 1
+            return web.Response(status=503)
+        return None
+
+    async def search(self, request: web.Request) -> web.Response:
+        if error := await self.respond("search"):
+            return error
+        rows: int = min(int(request.query.get("rows", 20)), self.max_rows)
+        page: int = int(request.query.get("page", 1))
+        jobs: list[dict] = filter_jobs(
+            self.query_jobs(request.query.get("query", "")), request.query
+        )
+        return web.json_response(
+            {
+                "num_pages": math.ceil(len(jobs) / rows),
+                "current_page": page,
+                "total_hits": len(jobs),
+                "documents": jobs[(page - 1) * rows : page * rows],
+                "normalized_search_query": request.query.get("query", ""),
+            }
+        )
+
+    async def job(self, request: web.Request) -> web.Response:
+        if error := await self.respond("job"):
+            return error
+        job_id: str = request.match_info["job_id"]
+        if job_id in self.details:
+            return web.json_response(self.details[job_id])
+        if job_id in self.jobs_by_id:
+            return web.json_response(synthetic_detail(self.jobs_by_id[job_id]))
+        return web.Response(status=404)
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.counts))
+
+
+def filter_jobs(jobs: list[dict], query) -> list[dict]:
+    """Jobs matching the facets and publication dates of a search query."""
+    if segments := query.getall("company-segments[]", []):
+        jobs = [job for job in jobs if job.get("company_segmentation") in segments]
+    if types := query.getall("employment-type-ids[]", []):
+        jobs = [
+            job
+            for job in jobs
+            if set(job.get("employment_type_ids", [])) & set(types)
+        ]
+    for param, keep in (
+        ("publication-date-from", lambda date, bound: date >= bound),
+        ("publication-date-to", lambda date, bound: date <= bound),
+    ):
+        if bound := query.get(param):
+            bound = datetime.strptime(bound, "%Y-%m-%d %H:%M:%S").isoformat()
+            jobs = [
+                job for job in jobs if keep(job.get("publication_date") or "", bound)
+            ]
+    return jobs
+
+
+def build_server(
+    hits: int = 1000,
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    archive: Optional[Path] = None,
+    max_rows: int = 100,
+) -> ReplayServer:
+    if archive is not None:
+        jobs, details = load_archive(archive)
+        jobs.sort(key=lambda job: job.get("publication_date") or "", reverse=True)
+        return ReplayServer(jobs, details, latency, error_rate, max_rows=max_rows)
+    return ReplayServer(None, None, latency, error_rate, hits, max_rows)
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--hits", type=int, default=1000, help="jobs per query")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-rows", type=int, default=100, help="largest page")
+    parser.add_argument("--archive", type=Path, default=None)
+    return parser
+
+
+def main() -> None:
+    args = parser().parse_args()
+    server: ReplayServer = build_server(
+        args.hits, args.latency, args.error_rate, args.archive, args.max_rows
+    )
+    print(f"Serving on http://{args.host}:{args.port}{API_PREFIX}/", flush=True)
+    web.run_app(server.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Throughput benchmark of the jobsch scraper against the offline replay server.
+
+    python -m benchmarks.scraper [--queries 4] [--hits 500] [--latency 0.02]
+                                 [--error-rate 0] [--rate 1000] [--json]
+
+Starts benchmarks.replay in a subprocess, runs `Scraper.main` in a scratch
+directory (fresh db, archive and cache) and reports requests/sec, jobs/sec,
+the time spent in db writes and the peak memory. Any other scraper setting
+can be overridden through the environment, e.g. SCRAPER_MAX_CONCURRENCY=32.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+ROOT: Path = Path(__file__).resolve().parents[1]
+
+WRITE_STATEMENTS: tuple[str, ...] = ("INSERT", "UPDATE", "DELETE")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30.0) -> None:
+    deadline: float = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"Replay server did not start on port {port}")
+
+
+class DbWriteTimer:
+    """Sums the execution time of the write statements of an engine."""
+
+    def __init__(self, engine) -> None:
+        from sqlalchemy import event
+
+        self.seconds: float = 0.0
+        self.statements: int = 0
+        event.listen(engine, "before_cursor_execute", self.before)
+        event.listen(engine, "after_cursor_execute", self.after)
+
+    def before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("started_at", []).append(time.perf_counter())
+
+    def after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed: float = time.perf_counter() - conn.info["started_at"].pop()
+        if statement.lstrip().upper().startswith(WRITE_STATEMENTS):
+            self.seconds += elapsed
+            self.statements += 1
+
+
+def run(args: argparse.Namespace, workdir: Path, port: int) -> dict[str, Any]:
+    os.environ["JOBSCH_API_URL"] = f"http://127.0.0.1:{port}/api/v1/public/"
+    for setting in ("RATE_PER_HOST", "RATE_MAX", "RATE_MIN", "RATE_BURST"):
+        os.environ.setdefault(f"SCRAPER_{setting}", str(args.rate))
+    # the scraper keeps its db, archive and cache under the working directory
+    os.chdir(workdir)
+
+    from interface.backend import db, scrapers
+
+    timer = DbWriteTimer(db.engine.sync_engine)
+    scraper = scrapers.jobsch.Scraper({}, {})
+    query_list: list[dict] = [
+        {"query": f"bench {idx}", "location": None, "days": None}
+        for idx in range(args.queries)
+    ]
+
+    started: float = time.perf_counter()
+    asyncio.run(scraper.main(query_list=query_list))
+    elapsed: float = time.perf_counter() - started
+
+    snapshot: dict[str, Any] = scraper.metrics.snapshot()
+    requests: int = sum(host["latency"]["count"] for host in snapshot["hosts"])
+    counters: dict[str, int] = snapshot["counters"]
+    return dict(
+        elapsed=elapsed,
+        requests=requests,
+        requests_per_sec=requests / elapsed,
+        jobs=counters.get("jobs_new", 0),
+        jobs_per_sec=counters.get("jobs_new", 0) / elapsed,
+        details_per_sec=counters.get("details", 0) / elapsed,
+        db_write_seconds=timer.seconds,
+        db_write_statements=timer.statements,
+        # statements of concurrent sessions overlap, so this can exceed 1
+        db_write_share=timer.seconds / elapsed,
+        # ru_maxrss is in kilobytes on linux
+        peak_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=4)
+    parser.add_argument("--hits", type=int, default=500, help="jobs per query")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate", type=float, default=1000, help="req/s per host")
+    parser.add_argument("--json", action="store_true", help="print the report as json")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch dir")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="scraper-bench-"))
+    port: int = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.replay",
+            f"--port={port}",
+            f"--hits={args.hits}",
+            f"--latency={args.latency}",
+            f"--error-rate={args.error_rate}",
+        ],
+        cwd=workdir,
+        env=os.environ | {"PYTHONPATH": str(ROOT)},
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port)
+        report: dict[str, Any] = run(args, workdir, port)
+    finally:
+        server.terminate()
+        server.wait()
+        os.chdir(ROOT)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(
+        f"{args.queries} queries x {args.hits} jobs, latency {args.latency}s, "
+        f"error rate {args.error_rate}"
+    )
+    for key, value in report.items():
+        print(f"{key:<20}{value:>12.2f}" if isinstance(value, float) else f"{key:<20}{value:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import json
+from datetime import date, datetime
+from logging import Logger
+from typing import Any, Callable, Optional, Union
+
+from .config import APISettings, get_api_settings
+from .logger import logdef
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib json is used instead
+    orjson = None
+
+config: APISettings = get_api_settings()
+
+log: Logger = logdef(__name__)
+
+
+class JsonCodec:
+    """Stdlib json codec, the fallback when orjson is not installed."""
+
+    name: str = "json"
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+    def dumps(
+        self,
+        obj: Any,
+        indent: bool = False,
+        default: Optional[Callable[[Any], Any]] = None,
+    ) -> bytes:
+        def fallback(value: Any) -> Any:
+            if isinstance(value, (datetime, date)):
+                return value.isoformat()
+            if default is not None:
+                return default(value)
+            raise TypeError(
+                f"Object of type {type(value).__name__} is not JSON serializable"
+            )
+
+        return json.dumps(
+            obj,
+            ensure_ascii=False,
+            separators=None if indent else (",", ":"),
+            indent=2 if indent else None,
+            default=fallback,
+        ).encode()
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    orjson codec: parses and serializes straight from / to bytes and
+    handles datetimes natively.
+    """
+
+    name: str = "orjson"
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+    def dumps(
+        self,
+        obj: Any,
+        indent: bool = False,
+        default: Optional[Callable[[Any], Any]] = None,
+    ) -> bytes:
+        option: int = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=option)
+
+
+CODECS: dict[str, type[JsonCodec]] = {"json": JsonCodec, "orjson": OrjsonCodec}
+
+
+def get_codec(name: str = "orjson") -> JsonCodec:
+    if name not in CODECS:
+        raise ValueError(f"Unsupported json codec: {name}")
+    if name == "orjson" and orjson is None:
+        log.warning("orjson is not installed, falling back to json.")
+        name = "json"
+    return CODECS[name]()
+
+
+codec: JsonCodec = get_codec(config.JSON_CODEC)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    return codec.loads(data)
+
+
+def dumps(
+    obj: Any, indent: bool = False, default: Optional[Callable[[Any], Any]] = None
+) -> bytes:
+    return codec.dumps(obj, indent=indent, default=default)
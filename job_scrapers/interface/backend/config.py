@@ -1,6 +1,6 @@
 from functools import lru_cache
 from pathlib import Path
-from typing import Callable
+from typing import Callable, Optional
 from ast import literal_eval
 from pydantic_settings import BaseSettings
 
@@ -27,7 +27,8 @@ class APISettings(BaseSettings):
     SQLALCHEMY_DATABASE_URI: str = f"sqlite:///{db_path}"
     SQLALCHEMY_TRACK_MODIFICATIONS: bool = False
     SQLALCHEMY_DATABASE_CONNECT_DICT: dict = {
-        "check_same_thread": False
+        "check_same_thread": False,
+        "timeout": 30,
     }  # needed only for sqlite3 compatibility
     debug: bool = True
     debug_exceptions: bool = False
@@ -37,6 +38,85 @@ class APISettings(BaseSettings):
     TEMPLATES_PATH: Path = REACT_TEMPLATE
     jinja_global_vars: dict[str, Callable] = {}
     jinja_filters: dict[str, Callable] = dict(lit_eval=lit_eval)
+    # json codec of the scraper and the api ("orjson" or "json")
+    JSON_CODEC: str = "orjson"
+    # html parser of the scrapers ("auto", "selectolax", "lxml" or "html.parser")
+    SCRAPER_HTML_PARSER: str = "auto"
+    # base url of the jobs.ch api, point it to benchmarks.replay to crawl offline
+    JOBSCH_API_URL: str = "https://www.jobs.ch/api/v1/public/"
+    # scraper http connection pool
+    SCRAPER_CONN_LIMIT: int = 100
+    SCRAPER_CONN_LIMIT_PER_HOST: int = 10
+    SCRAPER_DNS_CACHE_TTL: int = 300
+    SCRAPER_KEEPALIVE_TIMEOUT: float = 30
+    SCRAPER_TIMEOUT_TOTAL: float = 5
+    SCRAPER_TIMEOUT_CONNECT: Optional[float] = None
+    # request results newest first and stop paging at already stored jobs
+    SCRAPER_INCREMENTAL: bool = False
+    # queries crawled in parallel and global budget of in-flight requests
+    SCRAPER_QUERY_CONCURRENCY: int = 4
+    SCRAPER_MAX_CONCURRENCY: int = 16
+    # crawl worker processes and the leases they take on the work queue
+    SCRAPER_WORKERS: int = 4
+    SCRAPER_LEASE_BATCH: int = 16
+    SCRAPER_LEASE_SECONDS: float = 120
+    SCRAPER_TASK_MAX_ATTEMPTS: int = 3
+    # number of result pages of a query fetched in parallel (1 = sequential)
+    SCRAPER_PAGE_CONCURRENCY: int = 4
+    # page sizes probed, the largest one served in full is used
+    SCRAPER_PAGE_SIZES: list[int] = [100, 50, 20]
+    # requests with more hits are split into partitions by date window or facet
+    SCRAPER_PARTITION_THRESHOLD: int = 1000
+    # detail fetchers of a query and the jobs queued to them from its pages
+    SCRAPER_DETAIL_CONCURRENCY: int = 8
+    SCRAPER_DETAIL_QUEUE_SIZE: int = 100
+    # details are fetched newest first, the jobs of companies with saved or
+    # liked jobs and paid listings count as that many days newer
+    SCRAPER_DETAIL_PRIORITY_COMPANY_DAYS: float = 30
+    SCRAPER_DETAIL_PRIORITY_PAID_DAYS: float = 7
+    # detail requests of a run and seconds into it they may start (unset: no limit)
+    SCRAPER_DETAIL_BUDGET_REQUESTS: Optional[int] = None
+    SCRAPER_DETAIL_BUDGET_SECONDS: Optional[float] = None
+    # adaptive per-host rate limit (requests / sec)
+    SCRAPER_RATE_PER_HOST: float = 1.0
+    SCRAPER_RATE_BURST: float = 1
+    SCRAPER_RATE_MIN: float = 0.1
+    SCRAPER_RATE_MAX: float = 4.0
+    SCRAPER_RATE_INCREASE: float = 0.1
+    SCRAPER_RATE_DECREASE_FACTOR: float = 0.5
+    SCRAPER_RATE_RECOVERY_AFTER: int = 10
+    # retries with exponential backoff and full jitter (seconds)
+    SCRAPER_RETRIES: int = 3
+    SCRAPER_RETRY_BASE_DELAY: float = 0.5
+    SCRAPER_RETRY_MAX_DELAY: float = 30.0
+    SCRAPER_RETRY_STATUSES: list[int] = [429, 502, 503, 504]
+    # per-host circuit breaker: consecutive failures before it opens, pause
+    SCRAPER_BREAKER_THRESHOLD: int = 5
+    SCRAPER_BREAKER_RESET_TIMEOUT: float = 30.0
+    # raw response archive ("gzip" or "zstd")
+    SCRAPER_ARCHIVE_COMPRESSION: str = "gzip"
+    SCRAPER_ARCHIVE_SEGMENT_SIZE: int = 64 * 1024 * 1024
+    # responses waiting for the archive writer thread
+    SCRAPER_WRITER_QUEUE_SIZE: int = 256
+    # record updates of a crawl, written in batches (rows, seconds)
+    SCRAPER_UPDATE_BATCH_SIZE: int = 500
+    SCRAPER_UPDATE_FLUSH_INTERVAL: float = 0.5
+    # records held at a time when the jobs of a crawl are streamed from the db
+    SCRAPER_RECORD_CHUNK_SIZE: int = 500
+    # responses of a run kept to serve repeated urls without a request
+    # (number, bytes of their bodies)
+    SCRAPER_MEMO_SIZE: int = 1024
+    SCRAPER_MEMO_BYTES: int = 8 * 1024 * 1024
+    # jobs missing from this many full crawls of their query, and from every
+    # full crawl of the grace period (seconds), are marked expired
+    SCRAPER_EXPIRY: bool = True
+    SCRAPER_EXPIRY_GRACE_CRAWLS: int = 2
+    SCRAPER_EXPIRY_GRACE_SECONDS: float = 24 * 3600
+    # on-disk http cache of job details (seconds before revalidation), off by
+    # default: details are fetched once per job, so it only pays off for
+    # deliberate re-fetches of the same details
+    SCRAPER_HTTP_CACHE: bool = False
+    SCRAPER_HTTP_CACHE_TTL: float = 24 * 3600
 
 
 @lru_cache()
@@ -13,9 +13,11 @@ from .models import base
 from ..logger import logdef
 from . import models
 from .async_mode import Session, async_session, engine, get_ses
+from .batch import BatchUpdater
+from .expiry import ExpiryReconciler
 from .paginator import Pagination, paginate
 from .sync import engineSync, SessionLocalSync
-from .utils import get_primary_key, update_record, save_records, update_record_from_dict, create_record, get_records
+from .utils import get_primary_key, update_record, save_records, update_record_from_dict, create_record, get_records, get_ids, iter_records, insert_records, upsert_records, create_missing_columns, create_missing_indexes, get_max_value, lease_tasks, settle_tasks, count_tasks
 
 log: Logger = logdef(__name__)
 
@@ -25,6 +27,8 @@ Base = base.Base
 async def init() -> None:
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_missing_columns, Base.metadata)
+        await conn.run_sync(create_missing_indexes, Base.metadata)
     log.info("Db initialized.")
 
 
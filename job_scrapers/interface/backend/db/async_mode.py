@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
 
+from sqlalchemy import event
 from sqlalchemy.orm import Session, sessionmaker
 
 from ..config import APISettings, get_api_settings
@@ -32,6 +33,16 @@ engine: AsyncEngine = create_async_engine(
 #     class_=AsyncSession,
 # )
 
+
+@event.listens_for(engine.sync_engine, "connect")
+def set_sqlite_pragma(dbapi_connection, connection_record) -> None:
+    # WAL lets the readers of concurrent crawls run alongside the writer
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
 async_session = async_sessionmaker(engine, expire_on_commit=False)
 
 # Dependency
@@ -0,0 +1,130 @@
+import asyncio
+from logging import Logger
+from typing import Any, List, Optional
+
+from sqlalchemy import inspect, update
+
+from ..logger import logdef
+from .async_mode import async_session
+from .utils import save_records
+
+log: Logger = logdef(__name__)
+
+
+class BatchUpdater:
+    """
+    Buffers the changes of persisted records and writes them with one
+    executemany UPDATE (by primary key) per model, in a single transaction,
+    every `flush_interval` seconds or once `batch_size` rows are pending.
+
+    The attributes of the records are set right away, the database catches up
+    on the next flush. Successive changes of a row are merged. Call `flush`
+    before reading back what was updated and `close` at the end.
+    """
+
+    def __init__(self, batch_size: int = 500, flush_interval: float = 0.5) -> None:
+        self.batch_size: int = batch_size
+        self.flush_interval: float = flush_interval
+        # pending changes by model and primary key
+        self.pending: dict[type, dict[tuple, dict[str, Any]]] = {}
+        self.size: int = 0
+        self.flushes: int = 0
+        self.rows: int = 0
+        self._lock: asyncio.Lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_periodically())
+
+    async def update(self, records, dict_list: List[dict[str, Any]]) -> None:
+        """Same contract as update_record_from_dict, but batched."""
+        transient: list = []
+        for record, attr_dict in zip(records, dict_list):
+            for k, v in attr_dict.items():
+                setattr(record, k, v)
+            state = inspect(record)
+            if state.identity is None:
+                transient.append(record)
+                continue
+            mapper = state.mapper
+            key: dict[str, Any] = {
+                column.key: value
+                for column, value in zip(mapper.primary_key, state.identity)
+            }
+            rows: dict[tuple, dict[str, Any]] = self.pending.setdefault(
+                mapper.class_, {}
+            )
+            if state.identity not in rows:
+                rows[state.identity] = key
+                self.size += 1
+            rows[state.identity].update(attr_dict)
+        if transient:
+            # not stored yet, nothing to update by primary key
+            await save_records(transient)
+        self.start()
+        if self.size >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self.pending:
+                return
+            pending, self.pending, size, self.size = self.pending, {}, self.size, 0
+            try:
+                async with async_session.begin() as session:
+                    for model, rows in pending.items():
+                        await session.execute(update(model), list(rows.values()))
+            except Exception:
+                # keep the changes for the next flush, under the newer ones
+                for model, rows in pending.items():
+                    newer: dict[tuple, dict[str, Any]] = self.pending.setdefault(
+                        model, {}
+                    )
+                    for identity, row in rows.items():
+                        newer[identity] = row | newer.get(identity, {})
+                self.size = sum(len(rows) for rows in self.pending.values())
+                raise
+            self.flushes += 1
+            self.rows += size
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error("Failed to flush %s updates: %r", self.size, e)
+
+    async def close(self, retries: int = 3) -> None:
+        """
+        Stops the periodic flushes and writes what is pending, retrying with
+        a growing pause, e.g. while a cancelled transaction still holds the
+        database lock. Changes that cannot be written are logged and kept.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for attempt in range(retries):
+            try:
+                await self.flush()
+                return
+            except Exception as e:
+                if attempt == retries - 1:
+                    log.error(
+                        "Failed to flush %s updates on close: %r, pending: %s",
+                        self.size,
+                        e,
+                        self.pending,
+                    )
+                    raise
+                log.warning("Failed to flush %s updates on close: %r", self.size, e)
+                await asyncio.sleep(self.flush_interval * 2**attempt)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return dict(flushes=self.flushes, rows=self.rows, pending=self.size)
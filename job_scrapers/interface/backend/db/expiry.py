@@ -0,0 +1,158 @@
+import time
+import zlib
+from logging import Logger
+from typing import Iterable, List
+
+from sqlalchemy import delete, select, update
+
+from ..logger import logdef
+from .async_mode import async_session
+from .models.snapshot import Snapshot
+
+log: Logger = logdef(__name__)
+
+
+def set_bits(bits: bytearray, ids: Iterable[int]) -> bytearray:
+    """Sets bit n of `bits` for every id n, growing it as needed."""
+    for i in ids:
+        if i >> 3 >= len(bits):
+            bits.extend(bytes((i >> 3) - len(bits) + 1))
+        bits[i >> 3] |= 1 << (i & 7)
+    return bits
+
+
+def from_bitmap(bitmap: int) -> List[int]:
+    bits: bytes = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    return [
+        i * 8 + bit
+        for i, byte in enumerate(bits)
+        if byte
+        for bit in range(8)
+        if byte >> bit & 1
+    ]
+
+
+def pack(bitmap: int) -> bytes:
+    return zlib.compress(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little"))
+
+
+def unpack(data: bytes) -> int:
+    return int.from_bytes(zlib.decompress(data), "little")
+
+
+class ExpiryReconciler:
+    """
+    Expires the postings that vanished from the full crawls of a query.
+
+    Every full crawl leaves a snapshot of the jobs it found. A job that one
+    of the older snapshots holds but none of the recent ones, the last
+    `grace_crawls` crawls and every crawl of the last `grace_seconds`, is
+    marked expired. A listing that drops out of a crawl or two and comes
+    back is left alone, one that comes back after it expired is restored.
+    Jobs expired by hand are never touched. The older snapshots are dropped
+    once reconciled.
+    """
+
+    def __init__(
+        self, grace_crawls: int = 2, grace_seconds: float = 0, chunk_size: int = 10000
+    ) -> None:
+        self.grace_crawls: int = max(grace_crawls, 1)
+        self.grace_seconds: float = grace_seconds
+        self.chunk_size: int = chunk_size
+
+    async def reconcile(
+        self, site: str, key: str, request_id: int, job_model, seen: bytearray
+    ) -> int:
+        """
+        Stores the snapshot of a full crawl of the query `key`, the bitmap of
+        the row ids of the jobs it `seen`, restores the jobs it expired that
+        were seen again and expires the jobs that vanished, all in one
+        transaction. Returns the number of jobs expired.
+        """
+        bitmap: int = int.from_bytes(seen, "little")
+        now: float = time.time()
+        async with async_session.begin() as session:
+            session.add(
+                Snapshot(
+                    site=site,
+                    key=key,
+                    request_id=request_id,
+                    jobs=pack(bitmap),
+                    size=bitmap.bit_count(),
+                    taken_at=now,
+                )
+            )
+            await session.flush()
+
+            revived: list[int] = [
+                job_id
+                for job_id in (
+                    await session.execute(
+                        select(job_model.id).where(
+                            job_model.crawl_expired.is_(True),
+                            job_model.expired == 1,
+                        )
+                    )
+                ).scalars()
+                if job_id >> 3 < len(seen) and seen[job_id >> 3] >> (job_id & 7) & 1
+            ]
+            for i in range(0, len(revived), self.chunk_size):
+                await session.execute(
+                    update(job_model)
+                    .where(job_model.id.in_(revived[i : i + self.chunk_size]))
+                    .values(expired=None, crawl_expired=None)
+                    .execution_options(synchronize_session=False)
+                )
+            if revived:
+                log.info("%s: %s expired jobs of %s are back", site, len(revived), key)
+
+            snapshots: list = list(
+                (
+                    await session.execute(
+                        select(Snapshot)
+                        .where(Snapshot.site == site, Snapshot.key == key)
+                        .order_by(Snapshot.taken_at, Snapshot.id)
+                    )
+                ).scalars()
+            )
+            split: int = len(snapshots) - self.grace_crawls
+            while split > 0 and snapshots[split - 1].taken_at >= now - self.grace_seconds:
+                split -= 1
+            older, recent = snapshots[: max(split, 0)], snapshots[max(split, 0) :]
+            if not older:
+                return 0
+
+            before: int = 0
+            for snapshot in older:
+                before |= unpack(snapshot.jobs)
+            after: int = 0
+            for snapshot in recent:
+                after |= unpack(snapshot.jobs)
+            vanished: list[int] = from_bitmap(before & ~after)
+
+            expired: int = 0
+            for i in range(0, len(vanished), self.chunk_size):
+                result = await session.execute(
+                    update(job_model)
+                    .where(
+                        job_model.id.in_(vanished[i : i + self.chunk_size]),
+                        job_model.expired.is_not(1),
+                    )
+                    .values(expired=1, crawl_expired=True)
+                    .execution_options(synchronize_session=False)
+                )
+                expired += result.rowcount
+            await session.execute(
+                delete(Snapshot).where(
+                    Snapshot.id.in_([snapshot.id for snapshot in older])
+                )
+            )
+        log.info(
+            "%s: %s of %s jobs vanished from %s, %s expired",
+            site,
+            len(vanished),
+            before.bit_count(),
+            key,
+            expired,
+        )
+        return expired
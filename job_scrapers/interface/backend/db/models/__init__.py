@@ -1 +1 @@
-from . import jobsch
\ No newline at end of file
+from . import jobsch, queue, snapshot
\ No newline at end of file
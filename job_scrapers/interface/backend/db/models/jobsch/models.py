@@ -20,6 +20,15 @@ class Request(Base):
     duplicates: Mapped[Optional[int]]
     current_page: Mapped[Optional[int]]
     url_api: Mapped[Optional[str]]
+    # newest publication date seen, where incremental crawls stop paging
+    high_water_mark: Mapped[Optional[str]]
+    incremental: Mapped[Optional[bool]]
+    # crawl frontier state: pending, in_flight, done or skipped
+    frontier: Mapped[Optional[str]]
+    # partitions of a large request: the request they split and the
+    # querybuilder arguments (json) that narrow them down
+    parent_id: Mapped[Optional[int]] = mapped_column(ForeignKey("jobsch_requests.id"))
+    facets: Mapped[Optional[str]]
 
     sub_requests = relationship("Sub_Request", back_populates="request")
     jobs = relationship("Job", back_populates="request")
@@ -34,9 +43,11 @@ class Request(Base):
                 "id",
                 # "request_id",
                 "status",
+                "frontier",
                 "query",
                 "location",
                 "days",
+                "facets",
                 "current_page",
                 "num_pages",
                 "total_hits",
@@ -61,6 +72,8 @@ class Sub_Request(Base):
     request = relationship("Request", back_populates="sub_requests")
     jobs = relationship("Job", back_populates="sub_request")
     status: Mapped[Optional[int]]
+    # crawl frontier state: pending, in_flight or done
+    frontier: Mapped[Optional[str]]
 
     def logger(self, logger, log_type, text):
         super().logger(
@@ -91,7 +104,7 @@ class Job(Base):
     company_name: Mapped[Optional[str]]
     place: Mapped[Optional[str]]
     is_active: Mapped[Optional[bool]]
-    job_id: Mapped[Optional[str]]
+    job_id: Mapped[Optional[str]] = mapped_column(unique=True, index=True)
     preview: Mapped[Optional[str]]
     company_logo_file: Mapped[Optional[str]]
     slug: Mapped[Optional[str]]
@@ -115,10 +128,13 @@ class Job(Base):
     template_text: Mapped[Optional[str]]
     template_lead_text: Mapped[Optional[str]]
     headhunter_application_allowed: Mapped[Optional[bool]]
-    applied: Mapped[Optional[int]]
-    saved: Mapped[Optional[int]]
-    liked: Mapped[Optional[int]]
-    expired: Mapped[Optional[int]]
+    # set by the user, merged into the kept row when duplicates are dropped
+    applied: Mapped[Optional[int]] = mapped_column(info=dict(user_state=True))
+    saved: Mapped[Optional[int]] = mapped_column(info=dict(user_state=True))
+    liked: Mapped[Optional[int]] = mapped_column(info=dict(user_state=True))
+    expired: Mapped[Optional[int]] = mapped_column(info=dict(user_state=True))
+    # set when the expiry reconciler, not a hand toggle, expired the job
+    crawl_expired: Mapped[Optional[bool]]
 
     request_id: Mapped[int] = mapped_column(ForeignKey("jobsch_requests.id"))
     sub_request_id: Mapped[int] = mapped_column(ForeignKey("jobsch_sub_requests.id"))
@@ -0,0 +1,30 @@
+from typing import Optional
+
+from sqlalchemy import Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class Task(Base):
+    """
+    Work queue of the crawl workers: one row per page (sub request id) or
+    job detail (job_id) of a site. A worker leases a batch of pending rows
+    for a while; leases that expire go back to the queue.
+    """
+
+    __tablename__: str = "crawl_tasks"
+    __table_args__ = (
+        Index("ix_crawl_tasks_site_kind_key", "site", "kind", "key", unique=True),
+        Index("ix_crawl_tasks_site_kind_state", "site", "kind", "state"),
+    )
+
+    site: Mapped[str]
+    kind: Mapped[str]
+    key: Mapped[str]
+    request_id: Mapped[Optional[int]]
+    # pending, leased, done or failed
+    state: Mapped[str] = mapped_column(default="pending")
+    lease_owner: Mapped[Optional[str]]
+    lease_expires_at: Mapped[Optional[float]]
+    attempts: Mapped[int] = mapped_column(default=0)
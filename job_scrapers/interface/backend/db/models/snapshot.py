@@ -0,0 +1,23 @@
+from sqlalchemy import Index
+from sqlalchemy.orm import Mapped
+
+from .base import Base
+
+
+class Snapshot(Base):
+    """
+    The jobs a full crawl of a query found, as a compressed bitmap of their
+    row ids. Successive snapshots of a query tell which postings vanished.
+    """
+
+    __tablename__: str = "crawl_snapshots"
+    __table_args__ = (Index("ix_crawl_snapshots_site_key", "site", "key"),)
+
+    site: Mapped[str]
+    # the query the snapshot was taken of
+    key: Mapped[str]
+    request_id: Mapped[int]
+    # zlib compressed bitmap, bit n set when the job with id n was found
+    jobs: Mapped[bytes]
+    size: Mapped[int]
+    taken_at: Mapped[float]
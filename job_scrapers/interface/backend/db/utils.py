@@ -1,11 +1,27 @@
-from typing import Any, Coroutine, Dict, List, Optional, Tuple, Union
+import time
+from logging import Logger
+from typing import (
+    Any,
+    AsyncIterator,
+    Coroutine,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
-from sqlalchemy import Table, and_, inspect, not_, or_, select, text, update
+from sqlalchemy import Table, and_, func, insert, inspect, not_, or_, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm.decl_api import DeclarativeMeta
 
+from ..logger import logdef
 from .async_mode import async_session
 
+log: Logger = logdef(__name__)
+
 OPERATORS_MAP = {
     "==": lambda attr, value: attr == value,
     "!=": lambda attr, value: attr != value,
@@ -22,7 +38,7 @@ OPERATORS_MAP = {
     "like": lambda attr, value: attr.like(value),
     "ilike": lambda attr, value: attr.ilike(value),
     "is": lambda attr, value: attr.is_(value),
-    "not_is": lambda attr, value: ~attr.is_(value),
+    "not_is": lambda attr, value: attr.is_not(value),
 }
 
 
@@ -71,12 +87,227 @@ async def check_attribute_exists(
         return instance is not None
 
 
+async def get_ids(
+    db_model: Union[Table, DeclarativeMeta],
+    attribute_name: str,
+    values: List[Any],
+    chunk_size: int = 500,
+) -> list:
+    """Returns the primary keys of the rows whose column holds one of values."""
+    attr = getattr(db_model, attribute_name)
+    ids: list = []
+    async with async_session.begin() as session:
+        for i in range(0, len(values), chunk_size):
+            result = await session.execute(
+                select(db_model.id).where(attr.in_(values[i : i + chunk_size]))
+            )
+            ids.extend(result.scalars())
+    return ids
+
+
 async def save_records(records):
     async with async_session.begin() as ses:
         ses.add_all(records)
         await ses.commit()
 
 
+async def upsert_records(
+    model,
+    rows: List[dict[str, Any]],
+    index_elements: List[str],
+    update_fields: Optional[List[str]] = None,
+    batch_size: int = 500,
+    update_where: Optional[Any] = None,
+) -> list:
+    """
+    Inserts plain dict rows with one INSERT ... ON CONFLICT statement per batch.
+    On a conflict on `index_elements` (which need a unique index) the row is
+    skipped, or its `update_fields` are overwritten when given, only where the
+    stored row matches `update_where` when that is given too.
+
+    Returns the `index_elements` values of the rows that were written.
+    """
+    written: list = []
+    async with async_session.begin() as session:
+        for i in range(0, len(rows), batch_size):
+            stmt = sqlite_insert(model).values(rows[i : i + batch_size])
+            if update_fields:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=index_elements,
+                    set_={field: stmt.excluded[field] for field in update_fields},
+                    where=update_where,
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+            stmt = stmt.returning(*(getattr(model, col) for col in index_elements))
+            result = await session.execute(stmt)
+            written.extend(result.all())
+    return written
+
+
+async def insert_records(
+    model,
+    rows: List[dict[str, Any]],
+    returning: Optional[List[str]] = None,
+    batch_size: int = 500,
+) -> list:
+    """
+    Inserts plain dict rows with a Core INSERT executed once per batch
+    (executemany), without building ORM instances or going through the unit
+    of work. Column defaults still apply.
+
+    Returns the `returning` values of the inserted rows, in the order of
+    `rows`. RETURNING makes the insert several times slower, ask only for
+    what is needed.
+    """
+    stmt = insert(model)
+    if returning:
+        stmt = stmt.returning(
+            *(getattr(model, col) for col in returning), sort_by_parameter_order=True
+        )
+    written: list = []
+    async with async_session.begin() as session:
+        for i in range(0, len(rows), batch_size):
+            result = await session.execute(stmt, rows[i : i + batch_size])
+            if returning:
+                written.extend(result.all())
+    return written
+
+
+async def lease_tasks(
+    model,
+    site: str,
+    kind: str,
+    owner: str,
+    limit: int,
+    lease_seconds: float,
+) -> list:
+    """
+    Atomically leases up to `limit` tasks of `kind` that are pending or whose
+    lease expired, with a single UPDATE ... RETURNING. Returns the leased
+    (id, key, request_id, attempts) rows.
+    """
+    now: float = time.time()
+    leasable = (
+        select(model.id)
+        .where(
+            model.site == site,
+            model.kind == kind,
+            or_(
+                model.state == "pending",
+                and_(model.state == "leased", model.lease_expires_at < now),
+            ),
+        )
+        .order_by(model.id)
+        .limit(limit)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(model)
+        .where(model.id.in_(leasable))
+        .values(
+            state="leased",
+            lease_owner=owner,
+            lease_expires_at=now + lease_seconds,
+            attempts=model.attempts + 1,
+        )
+        .returning(model.id, model.key, model.request_id, model.attempts)
+        .execution_options(synchronize_session=False)
+    )
+    async with async_session.begin() as session:
+        return list((await session.execute(stmt)).all())
+
+
+async def settle_tasks(model, ids: List[int], owner: str, state: str) -> int:
+    """
+    Moves the tasks still leased by `owner` to `state`. A task whose lease
+    expired and was taken over by another worker is left alone, so each
+    task is completed once. Returns the number of tasks moved.
+    """
+    if not ids:
+        return 0
+    stmt = (
+        update(model)
+        .where(model.id.in_(ids), model.state == "leased", model.lease_owner == owner)
+        .values(state=state, lease_owner=None, lease_expires_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    async with async_session.begin() as session:
+        return (await session.execute(stmt)).rowcount
+
+
+async def count_tasks(model, site: str, states: List[str]) -> int:
+    async with async_session.begin() as session:
+        return (
+            await session.execute(
+                select(func.count(model.id)).where(
+                    model.site == site, model.state.in_(states)
+                )
+            )
+        ).scalar()
+
+
+def create_missing_columns(conn: Connection, metadata) -> None:
+    """
+    create_all does not alter existing tables, so nullable columns
+    added to a model later are added here.
+    """
+    for table in metadata.sorted_tables:
+        existing: set = {col["name"] for col in inspect(conn).get_columns(table.name)}
+        for col in table.columns:
+            if col.name not in existing and col.nullable:
+                col_type: str = col.type.compile(dialect=conn.dialect)
+                conn.execute(
+                    text(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col_type}")
+                )
+
+
+def create_missing_indexes(conn: Connection, metadata) -> None:
+    """
+    create_all skips the indexes of tables that already exist, so indexes
+    added to a model later are created here. Rows violating a new
+    single column unique index are dropped first, keeping the oldest one,
+    into which the user state columns of the dropped ones are merged.
+    """
+    for table in metadata.sorted_tables:
+        existing: set = {ix["name"] for ix in inspect(conn).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            if index.unique and len(index.columns) == 1:
+                col = next(iter(index.columns))
+                kept: str = (
+                    f"SELECT MIN(id) FROM {table.name} "
+                    f"WHERE {col.name} IS NOT NULL GROUP BY {col.name}"
+                )
+                if merged := [c.name for c in table.columns if c.info.get("user_state")]:
+                    assignments: str = ", ".join(
+                        f"{name} = (SELECT MAX(d.{name}) FROM {table.name} AS d "
+                        f"WHERE d.{col.name} = {table.name}.{col.name})"
+                        for name in merged
+                    )
+                    conn.execute(
+                        text(
+                            f"UPDATE {table.name} SET {assignments} "
+                            f"WHERE id IN ({kept} HAVING COUNT(*) > 1)"
+                        )
+                    )
+                deleted: int = conn.execute(
+                    text(
+                        f"DELETE FROM {table.name} WHERE {col.name} IS NOT NULL "
+                        f"AND id NOT IN ({kept})"
+                    )
+                ).rowcount
+                if deleted:
+                    log.warning(
+                        "Dropped %s rows of %s duplicating %s before indexing it",
+                        deleted,
+                        table.name,
+                        col.name,
+                    )
+            index.create(conn)
+
+
 async def update_record_from_dict(records, dict_list: List[dict[str, Any]]):
     for record, attr_dict in zip(records, dict_list):
         for k, v in attr_dict.items():
@@ -90,31 +321,70 @@ async def create_record(record_model, *args, **kwds):
     return record
 
 
+def build_filters(
+    model,
+    conditions: List[Tuple[str, str, Union[Any, List[Any]]]],
+    logical_operator: Optional[str] = "AND",
+):
+    filters = []
+    for attrib, op, value in conditions:
+        if op not in OPERATORS_MAP:
+            raise ValueError(f"Unsupported operator: {op}")
+        filter_condition = OPERATORS_MAP[op](getattr(model, attrib), value)
+        filters.append(filter_condition)
+
+    if logical_operator is None:
+        return and_(True, *filters)
+    elif logical_operator.upper() == "AND":
+        return and_(*filters)
+    elif logical_operator.upper() == "OR":
+        return or_(*filters)
+    elif logical_operator.upper() == "NOT":
+        return not_(*filters)
+    raise ValueError("Logical operator must be 'AND', 'OR', or 'NOT'")
+
+
 async def get_records(
     model,
     conditions: List[Tuple[str, str, Union[Any, List[Any]]]],
     logical_operator: str = "AND",
 ):
     async with async_session.begin() as session:
-        query = select(model)
-        filters = []
-
-        for attrib, op, value in conditions:
-            if op not in OPERATORS_MAP:
-                raise ValueError(f"Unsupported operator: {op}")
-            filter_condition = OPERATORS_MAP[op](getattr(model, attrib), value)
-            filters.append(filter_condition)
-
-        if logical_operator.upper() == "AND":
-            query = query.where(and_(*filters))
-        elif logical_operator.upper() == "OR":
-            query = query.where(or_(*filters))
-        elif logical_operator.upper() == "NOT":
-            query = query.where(not_(*filters))
-        elif logical_operator is None:
-            query = query.where(*filters)
-        else:
-            raise ValueError("Logical operator must be 'AND', 'OR', or 'NOT'")
-
+        query = select(model).where(build_filters(model, conditions, logical_operator))
         result = await session.execute(query)
         return list(result.scalars())
+
+
+async def iter_records(
+    model,
+    conditions: List[Tuple[str, str, Union[Any, List[Any]]]],
+    logical_operator: str = "AND",
+    chunk_size: int = 500,
+) -> AsyncIterator[list]:
+    """
+    Same query as get_records, streamed in chunks of `chunk_size` records
+    (yield_per). The session only holds weak references to unmodified
+    records, a chunk is released once the caller drops it. The read stays
+    open until the iteration ends.
+    """
+    async with async_session() as session:
+        result = await session.stream_scalars(
+            select(model)
+            .where(build_filters(model, conditions, logical_operator))
+            .execution_options(yield_per=chunk_size)
+        )
+        async for chunk in result.partitions():
+            yield list(chunk)
+
+
+async def get_max_value(
+    model,
+    attribute_name: str,
+    conditions: List[Tuple[str, str, Union[Any, List[Any]]]],
+    logical_operator: str = "AND",
+) -> Any:
+    async with async_session.begin() as session:
+        query = select(func.max(getattr(model, attribute_name))).where(
+            build_filters(model, conditions, logical_operator)
+        )
+        return (await session.execute(query)).scalar()
@@ -88,7 +88,12 @@ async def jobs_api(
     rq_args: dict[str, str] = dict(request.query_params)
     table = db.models.jobsch.Job
     date_col = getattr(table, "publication_date")
-    sql = db.select(table).order_by(date_col.desc()).limit(5)
+    sql = (
+        db.select(table)
+        .where(table.expired.is_not(1))
+        .order_by(date_col.desc())
+        .limit(5)
+    )
     jobs = (await ses.execute(sql)).scalars()
     jobs = [job._dict() for job in jobs]
     return jsonResp({"data": jobs})
@@ -105,6 +110,9 @@ async def jobs_api_items(
     filter_args: list = []
     per_page: int = int(rq_args.get("per_page") or 5)
     filter_args = await setup_filters(rq_args, table)
+    if hasattr(table, "expired") and not rq_args.get("expired"):
+        # expired postings are listed only when filtered for
+        filter_args.append(table.expired.is_not(1))
 
     order = await order_filter(rq_args, table)
     sql = db.select(table).filter(db.and_(True, *filter_args)).order_by(order)
@@ -242,5 +250,11 @@ async def jobs_api_expire(
         {0: 1, None: 1, 1: 0},
         ses,
     )
+    if job.get("crawl_expired"):
+        # a hand toggle takes the job over from the expiry reconciler
+        await db.update_record(
+            eval(table), [identifier_value], identifier, "crawl_expired", None
+        )
+        job["crawl_expired"] = None
     print(f"{job['expired']=}")
     return jsonResp(job)
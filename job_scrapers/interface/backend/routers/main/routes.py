@@ -1,14 +1,18 @@
 from logging import Logger
 
 from fastapi import Request
-from fastapi.responses import HTMLResponse
-from ..utils import render_html
+from fastapi.responses import HTMLResponse, JSONResponse
+from ..utils import jsonResp, render_html
 from ... import db
+from ...config import APISettings, get_api_settings
+from ...scrapers.base import crawl_metrics
 from . import router
 from ...logger import logdef
 
 log: Logger = logdef(__name__)
 
+config: APISettings = get_api_settings()
+
 @router.get("/favicon.ico")
 def favicon() -> tuple[str, int]:
     return "dummy", 200
@@ -29,3 +33,6 @@ def main_index(request: Request):
     return render_html("index.html")
 
 
+@router.get("/metrics")
+def metrics() -> JSONResponse:
+    return jsonResp(crawl_metrics(config.DATA_PATH))
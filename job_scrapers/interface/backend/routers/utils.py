@@ -24,7 +24,7 @@ from sqlalchemy.sql.expression import ColumnOperators
 from starlette.templating import _TemplateResponse
 
 # from job_seeker import get_country_str, get_jobs_from_country
-from .. import db
+from .. import codec, db
 from ..config import APISettings, get_api_settings
 from ..logger import logdef
 
@@ -44,8 +44,18 @@ def get_outer_scope_var(var_type: Any) -> Any | None:
         return vars[0]
 
 
+class CodecJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered by the json codec. Plain values (and datetimes)
+    are serialized directly, jsonable_encoder only handles the rest.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return codec.dumps(content, default=jsonable_encoder)
+
+
 def jsonResp(d: dict) -> JSONResponse:
-    return JSONResponse(content=jsonable_encoder(d))
+    return CodecJSONResponse(content=d)
 
 
 def render_html(
@@ -1,2 +1,11 @@
-from .requests import fetch_all
+from .archive import SegmentArchive
+from .cache import HttpCache
+from .metrics import CrawlMetrics, crawl_metrics
+from .parsing import get_parser, html_text, select
+from .priority import DetailBudget, DetailPriority, DetailQueue
+from .ratelimit import HostRateLimiter
+from .requests import create_session, fetch_all
+from .retry import HostCircuitBreaker, RetryPolicy
 from .scraper import BaseScraper
+from .singleflight import SingleFlight, canonical_url
+from .writer import BackgroundWriter
@@ -0,0 +1,199 @@
+import gzip
+import threading
+from logging import Logger
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator, Optional
+
+from interface.backend import codec
+from interface.backend.logger import logdef
+
+try:
+    import zstandard
+except ImportError:  # optional, gzip is used instead
+    zstandard = None
+
+log: Logger = logdef(__name__)
+
+SEGMENT_SUFFIXES: dict[str, str] = {"gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+
+def compress(payload: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().compress(payload)
+    return gzip.compress(payload, mtime=0)
+
+
+def decompress(blob: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return gzip.decompress(blob)
+
+
+def segment_compression(path: Path) -> str:
+    return "zstd" if path.name.endswith(SEGMENT_SUFFIXES["zstd"]) else "gzip"
+
+
+def iter_lines(stream, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    buffer: bytes = b""
+    while chunk := stream.read(chunk_size):
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        yield from (line for line in lines if line)
+    if buffer:
+        yield buffer
+
+
+class SegmentArchive:
+    """
+    Append-only archive of json documents, stored as compressed jsonl segments.
+
+    Every record is compressed as an independent gzip member / zstd frame, so
+    a segment can be either streamed as a whole or read at a single offset.
+    The sidecar `index.jsonl` maps each key to [segment, offset, length];
+    when a key is written again the latest record wins.
+
+    ================================================================
+
+    Args:
+        root (Path): Directory of the segments and the index.
+
+        compression (str): "gzip" or "zstd" (needs the zstandard package).
+
+        segment_size (int): Size in bytes after which a new segment is started.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        compression: str = "gzip",
+        segment_size: int = 64 * 1024 * 1024,
+    ) -> None:
+        if compression not in SEGMENT_SUFFIXES:
+            raise ValueError(f"Unsupported compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            log.warning("zstandard is not installed, falling back to gzip.")
+            compression = "gzip"
+        self.root: Path = root
+        self.compression: str = compression
+        self.segment_size: int = segment_size
+        self.index_path: Path = root / "index.jsonl"
+        self._index: Optional[dict[str, tuple[str, int, int]]] = None
+        self._segment: Optional[BinaryIO] = None
+        self._segment_path: Optional[Path] = None
+        self._index_file = None
+        self._lock: threading.Lock = threading.Lock()
+
+    def __enter__(self) -> "SegmentArchive":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def index(self) -> dict[str, tuple[str, int, int]]:
+        """Loaded on the first lookup, writing only appends to `index.jsonl`."""
+        with self._lock:
+            if self._index is None:
+                if self._index_file is not None:
+                    self._index_file.flush()
+                self._index = {}
+                if self.index_path.exists():
+                    with self.index_path.open(encoding="utf-8") as file:
+                        for line in file:
+                            if line.strip():
+                                key, segment, offset, length = codec.loads(line)
+                                self._index[key] = (segment, offset, length)
+            return self._index
+
+    def segments(self) -> list[Path]:
+        return sorted(
+            path
+            for suffix in SEGMENT_SUFFIXES.values()
+            for path in self.root.glob(f"segment-*{suffix}")
+        )
+
+    def _open_segment(self) -> BinaryIO:
+        if self._segment is not None and self._segment.tell() < self.segment_size:
+            return self._segment
+        if self._segment is not None:
+            self._segment.close()
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        segments: list[Path] = self.segments()
+        last: Optional[Path] = segments[-1] if segments else None
+        if (
+            last is not None
+            and segment_compression(last) == self.compression
+            and last.stat().st_size < self.segment_size
+        ):
+            self._segment_path = last
+        else:
+            number: int = int(last.name.split("-")[1].split(".")[0]) + 1 if last else 1
+            suffix: str = SEGMENT_SUFFIXES[self.compression]
+            self._segment_path = self.root / f"segment-{number:06d}{suffix}"
+        self._segment = self._segment_path.open(mode="ab")
+        return self._segment
+
+    def write(self, key: str, data: Any) -> None:
+        payload: bytes = codec.dumps({"key": key, "data": data}) + b"\n"
+        blob: bytes = compress(payload, self.compression)
+        with self._lock:
+            segment: BinaryIO = self._open_segment()
+            offset: int = segment.tell()
+            segment.write(blob)
+            if self._index_file is None:
+                self._index_file = self.index_path.open(mode="a", encoding="utf-8")
+            entry = (self._segment_path.name, offset, len(blob))
+            self._index_file.write(codec.dumps([key, *entry]).decode() + "\n")
+            if self._index is not None:
+                self._index[key] = entry
+
+    def read(self, key: str) -> Any:
+        """Random access read of the latest record of `key`."""
+        segment, offset, length = self.index[key]
+        path: Path = self.root / segment
+        with self._lock:
+            if self._segment is not None and path == self._segment_path:
+                self._segment.flush()
+        with path.open(mode="rb") as file:
+            file.seek(offset)
+            blob: bytes = file.read(length)
+        return codec.loads(decompress(blob, segment_compression(path)))["data"]
+
+    def __iter__(self) -> Iterator[tuple[str, Any]]:
+        """Streams every (key, data) record, segment by segment, in write order."""
+        self.flush()
+        for path in self.segments():
+            with path.open(mode="rb") as raw:
+                if segment_compression(path) == "zstd":
+                    stream = zstandard.ZstdDecompressor().stream_reader(
+                        raw, read_across_frames=True
+                    )
+                else:
+                    stream = gzip.GzipFile(fileobj=raw)
+                with stream:
+                    for line in iter_lines(stream):
+                        record: dict = codec.loads(line)
+                        yield record["key"], record["data"]
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._segment is not None:
+                self._segment.flush()
+            if self._index_file is not None:
+                self._index_file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+            if self._index_file is not None:
+                self._index_file.close()
+                self._index_file = None
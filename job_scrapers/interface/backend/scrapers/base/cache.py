@@ -0,0 +1,136 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from logging import Logger
+from pathlib import Path
+from typing import Any, Optional
+
+from interface.backend.logger import logdef
+
+log: Logger = logdef(__name__)
+
+CACHE_COLUMNS: tuple[str, ...] = (
+    "url",
+    "status",
+    "content_type",
+    "encoding",
+    "etag",
+    "last_modified",
+    "stored_at",
+    "body",
+)
+
+
+class HttpCache:
+    """
+    On-disk cache of successful GET responses, keyed by url and stored in a
+    standalone sqlite file. Entries younger than `ttl` seconds are served
+    without a request; older ones are revalidated with If-None-Match /
+    If-Modified-Since when the server sent an ETag / Last-Modified.
+
+    ================================================================
+
+    Attributes:
+        hits (int): Responses served from a fresh entry.
+
+        revalidated (int): Stale entries the server confirmed with a 304.
+
+        misses (int): Responses that had to be downloaded.
+    """
+
+    def __init__(self, path: Path, ttl: float = 24 * 3600) -> None:
+        self.path: Path = path
+        self.ttl: float = ttl
+        self.hits: int = 0
+        self.revalidated: int = 0
+        self.misses: int = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS http_cache ("
+                "url TEXT PRIMARY KEY, status INTEGER, content_type TEXT, "
+                "encoding TEXT, etag TEXT, last_modified TEXT, stored_at REAL, "
+                "body BLOB)"
+            )
+        return self._conn
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return dict(hits=self.hits, revalidated=self.revalidated, misses=self.misses)
+
+    def _get(self, url: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(CACHE_COLUMNS)} FROM http_cache WHERE url = ?",
+                (url,),
+            ).fetchone()
+        return dict(zip(CACHE_COLUMNS, row)) if row else None
+
+    def _put(self, entry: dict[str, Any]) -> None:
+        with self._lock, self.conn:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO http_cache ({', '.join(CACHE_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(CACHE_COLUMNS))})",
+                tuple(entry[col] for col in CACHE_COLUMNS),
+            )
+
+    def _touch(self, url: str, stored_at: float) -> None:
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE http_cache SET stored_at = ? WHERE url = ?", (stored_at, url)
+            )
+
+    async def get(self, url: str) -> Optional[dict[str, Any]]:
+        return await asyncio.to_thread(self._get, url)
+
+    async def put(
+        self,
+        url: str,
+        status: int,
+        headers,
+        encoding: Optional[str],
+        body: bytes,
+    ) -> None:
+        if "no-store" in headers.get("Cache-Control", ""):
+            return
+        entry: dict[str, Any] = dict(
+            url=url,
+            status=status,
+            content_type=headers.get("Content-Type", ""),
+            encoding=encoding,
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+            stored_at=time.time(),
+            body=body,
+        )
+        await asyncio.to_thread(self._put, entry)
+
+    async def touch(self, entry: dict[str, Any]) -> None:
+        entry["stored_at"] = time.time()
+        await asyncio.to_thread(self._touch, entry["url"], entry["stored_at"])
+
+    def is_fresh(self, entry: dict[str, Any]) -> bool:
+        return time.time() - entry["stored_at"] < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: dict[str, Any]) -> dict[str, str]:
+        headers: dict[str, str] = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,160 @@
+import bisect
+import math
+import time
+from collections import defaultdict
+from logging import Logger
+from pathlib import Path
+from typing import Any, Callable, Optional
+from urllib.parse import urlsplit
+
+from interface.backend import codec
+from interface.backend.logger import logdef
+
+log: Logger = logdef(__name__)
+
+# upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS: tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, math.inf)
+
+# live metrics of the crawls of this process, by site name
+REGISTRY: dict[str, "CrawlMetrics"] = {}
+
+
+class Histogram:
+    """Fixed bucket histogram, with the count, sum and max of the values."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets: tuple[float, ...] = buckets
+        self.counts: list[int] = [0] * len(buckets)
+        self.count: int = 0
+        self.sum: float = 0.0
+        self.max: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the `q` quantile."""
+        rank: float = q * self.count
+        seen: int = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self) -> dict[str, Any]:
+        return dict(
+            count=self.count,
+            mean=self.sum / self.count if self.count else 0.0,
+            p50=self.quantile(0.5),
+            p95=self.quantile(0.95),
+            max=self.max,
+            buckets={str(bound): count for bound, count in zip(self.buckets, self.counts)},
+        )
+
+
+class CrawlMetrics:
+    """
+    Counters of a crawl, keyed by host and stage (search, page, detail):
+    request latencies, bytes received, status codes and retries, plus the
+    crawl wide counters (jobs, details) and gauges (queue depths).
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name: str = name
+        self.gauges: dict[str, Callable[[], int]] = {}
+        self.start()
+
+    def start(self) -> None:
+        """Resets every counter, the gauges are kept."""
+        self.started_at: float = time.monotonic()
+        self.latency: defaultdict[tuple[str, str], Histogram] = defaultdict(Histogram)
+        self.bytes: defaultdict[tuple[str, str], int] = defaultdict(int)
+        self.statuses: defaultdict[tuple[str, str], defaultdict[str, int]] = (
+            defaultdict(lambda: defaultdict(int))
+        )
+        self.retries: defaultdict[tuple[str, str], int] = defaultdict(int)
+        self.counters: defaultdict[str, int] = defaultdict(int)
+
+    def observe(
+        self, url: str, stage: str, status: Any, elapsed: float, size: int = 0
+    ) -> None:
+        key: tuple[str, str] = (urlsplit(url).netloc, stage)
+        self.latency[key].observe(elapsed)
+        self.bytes[key] += size
+        self.statuses[key][str(status)] += 1
+
+    def retry(self, url: str, stage: str) -> None:
+        self.retries[(urlsplit(url).netloc, stage)] += 1
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.counters[name] += value
+
+    def gauge(self, name: str, func: Callable[[], int]) -> None:
+        self.gauges[name] = func
+
+    def snapshot(self) -> dict[str, Any]:
+        elapsed: float = time.monotonic() - self.started_at
+        return dict(
+            name=self.name,
+            elapsed=elapsed,
+            counters=dict(self.counters),
+            rates={
+                f"{name}_per_sec": value / elapsed if elapsed else 0.0
+                for name, value in self.counters.items()
+            },
+            gauges={name: func() for name, func in self.gauges.items()},
+            hosts=[
+                dict(
+                    host=host,
+                    stage=stage,
+                    latency=histogram.snapshot(),
+                    bytes=self.bytes[(host, stage)],
+                    statuses=dict(self.statuses[(host, stage)]),
+                    retries=self.retries[(host, stage)],
+                )
+                for (host, stage), histogram in self.latency.items()
+            ],
+        )
+
+    def summary(self) -> str:
+        snapshot: dict[str, Any] = self.snapshot()
+        lines: list[str] = [
+            f"Crawl {self.name} in {snapshot['elapsed']:.1f}s: "
+            + ", ".join(
+                f"{name} {value} ({snapshot['rates'][f'{name}_per_sec']:.2f}/s)"
+                for name, value in snapshot["counters"].items()
+            )
+        ]
+        for host in snapshot["hosts"]:
+            latency: dict[str, Any] = host["latency"]
+            lines.append(
+                f"{host['host']} {host['stage']}: {latency['count']} requests, "
+                f"mean {latency['mean']:.3f}s, p95 {latency['p95']:.3f}s, "
+                f"max {latency['max']:.3f}s, {host['bytes']} bytes, "
+                f"statuses {host['statuses']}, retries {host['retries']}"
+            )
+        return "\n".join(lines)
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(codec.dumps(self.snapshot(), indent=True))
+
+
+def crawl_metrics(data_path: Optional[Path] = None) -> dict[str, Any]:
+    """
+    Snapshots of the crawls running in this process and the last ones saved
+    under `data_path`/scraped/<site>/ (metrics.json, one per worker process).
+    """
+    snapshots: dict[str, Any] = {
+        name: dict(live=True) | metrics.snapshot() for name, metrics in REGISTRY.items()
+    }
+    if data_path is not None:
+        for path in sorted(data_path.glob("scraped/*/metrics*.json")):
+            snapshot: dict[str, Any] = codec.loads(path.read_bytes())
+            if snapshot["name"] not in snapshots:
+                snapshots[snapshot["name"]] = dict(live=False) | snapshot
+    return snapshots
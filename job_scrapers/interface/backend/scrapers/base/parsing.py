@@ -0,0 +1,111 @@
+import re
+from logging import Logger
+from typing import Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from interface.backend.config import APISettings, get_api_settings
+from interface.backend.logger import logdef
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:  # optional, bs4 is used instead
+    HTMLParser = None
+
+try:
+    import lxml  # noqa: F401
+except ImportError:  # optional, html.parser is used instead
+    lxml = None
+
+config: APISettings = get_api_settings()
+
+log: Logger = logdef(__name__)
+
+# html parsers, fastest first
+PARSERS: tuple[str, ...] = ("selectolax", "lxml", "html.parser")
+
+# leading tag name of a css selector, e.g. "div" of "div.job > h1"
+TAG_RE: re.Pattern = re.compile(r"^([a-zA-Z][\w-]*)(?=$|[\s.#\[:>+~])")
+# sibling combinators, selector lists and pseudo-classes (:first-child,
+# :nth-of-type, ...) depend on nodes outside the subtree of the leading tag,
+# so the selectors with them are matched against the full tree
+UNSTRAINED_RE: re.Pattern = re.compile(r"[+~,:]")
+
+
+def available(name: str) -> bool:
+    if name == "selectolax":
+        return HTMLParser is not None
+    if name == "lxml":
+        return lxml is not None
+    return name == "html.parser"
+
+
+def get_parser(name: Optional[str] = None) -> str:
+    """
+    Resolves `name` (defaults to SCRAPER_HTML_PARSER) to an installed
+    parser. "auto" picks the fastest one, a missing one falls back to it.
+    """
+    name = name or config.SCRAPER_HTML_PARSER
+    if name != "auto" and name not in PARSERS:
+        raise ValueError(f"Unsupported html parser: {name}")
+    if name != "auto" and not available(name):
+        log.warning("%s is not installed, falling back to the fastest parser.", name)
+        name = "auto"
+    if name == "auto":
+        name = next(parser for parser in PARSERS if available(parser))
+    return name
+
+
+def soup_features(name: Optional[str] = None) -> str:
+    """bs4 tree builder of the parser, selectolax does not build bs4 trees."""
+    name = get_parser(name)
+    if name == "selectolax":
+        return "lxml" if available("lxml") else "html.parser"
+    return name
+
+
+def select(
+    html: str, selectors: dict[str, str], parser: Optional[str] = None
+) -> dict[str, Optional[str]]:
+    """
+    Extracts the stripped text of the first match of each css selector,
+    None when nothing matches.
+
+    With selectolax no bs4 tree is built at all. With bs4, when every selector
+    starts with a tag name and stays within its subtree, only the subtrees of
+    those tags are parsed.
+    """
+    name: str = get_parser(parser)
+    if name == "selectolax":
+        tree = HTMLParser(html)
+        nodes = {field: tree.css_first(selector) for field, selector in selectors.items()}
+        return {
+            field: node.text(strip=True) if node is not None else None
+            for field, node in nodes.items()
+        }
+
+    tags: list = [
+        None if UNSTRAINED_RE.search(selector) else TAG_RE.match(selector.strip())
+        for selector in selectors.values()
+    ]
+    strainer: Optional[SoupStrainer] = (
+        SoupStrainer({tag.group(1).lower() for tag in tags}) if all(tags) else None
+    )
+    tree = BeautifulSoup(html, features=name, parse_only=strainer)
+    result: dict[str, Optional[str]] = {}
+    for field, selector in selectors.items():
+        node = tree.select_one(selector)
+        result[field] = node.get_text(strip=True) if node is not None else None
+    return result
+
+
+def html_text(html: str, separator: str = " ", parser: Optional[str] = None) -> str:
+    """Text content of an html fragment, e.g. the template_text of a job."""
+    if not html:
+        return ""
+    if get_parser(parser) == "selectolax":
+        tree = HTMLParser(html)
+        return tree.body.text(separator=separator, strip=True) if tree.body else ""
+    return BeautifulSoup(html, features=soup_features(parser)).get_text(
+        separator, strip=True
+    )
@@ -0,0 +1,131 @@
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime
+from logging import Logger
+from typing import Any, Optional
+
+from interface.backend.logger import logdef
+
+log: Logger = logdef(__name__)
+
+DAY: float = 24 * 3600
+
+
+def published_at(value: Optional[str]) -> Optional[float]:
+    """Timestamp of an iso publication date, None when it cannot be read."""
+    try:
+        return datetime.fromisoformat(value).timestamp()  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return None
+
+
+class DetailPriority:
+    """
+    Ranks the jobs waiting for their details, lower first: by age in days,
+    minus `company_days` for a company with saved or liked jobs and minus
+    `paid_days` for a paid listing. Jobs without a date come last.
+    """
+
+    def __init__(
+        self,
+        date_field: str,
+        company_field: Optional[str] = None,
+        paid_field: Optional[str] = None,
+        company_days: float = 30,
+        paid_days: float = 7,
+    ) -> None:
+        self.date_field: str = date_field
+        self.company_field: Optional[str] = company_field
+        self.paid_field: Optional[str] = paid_field
+        self.company_days: float = company_days
+        self.paid_days: float = paid_days
+        # companies of the saved or liked jobs
+        self.companies: set = set()
+
+    def rank(self, job: Any) -> float:
+        published: Optional[float] = published_at(getattr(job, self.date_field, None))
+        if published is None:
+            return float("inf")
+        rank: float = (time.time() - published) / DAY
+        if self.company_field and getattr(job, self.company_field, None) in self.companies:
+            rank -= self.company_days
+        if self.paid_field and getattr(job, self.paid_field, None):
+            rank -= self.paid_days
+        return rank
+
+
+class DetailQueue(asyncio.Queue):
+    """
+    Queue of jobs backed by a heap: `get` returns the best ranked job that
+    is queued, jobs of the same rank in the order they were put.
+    """
+
+    def __init__(self, priority: DetailPriority, maxsize: int = 0) -> None:
+        self.priority: DetailPriority = priority
+        self._counter = itertools.count()
+        super().__init__(maxsize)
+
+    def _init(self, maxsize: int) -> None:
+        self._queue: list = []
+
+    def _put(self, job: Any) -> None:
+        heapq.heappush(self._queue, (self.priority.rank(job), next(self._counter), job))
+
+    def _get(self) -> Any:
+        return heapq.heappop(self._queue)[-1]
+
+
+class DetailBudget:
+    """
+    Budget of the detail requests of a run and of the seconds since `start`
+    in which they may be made, None for no limit. Jobs over budget are left
+    for the next run. A limited budget is only spent in the ranked pass over
+    the jobs of every query, so that it goes to the best ranked ones.
+    """
+
+    def __init__(
+        self, requests: Optional[int] = None, seconds: Optional[float] = None
+    ) -> None:
+        self.requests: Optional[int] = requests
+        self.seconds: Optional[float] = seconds
+        self.started_at: Optional[float] = None
+        self.used: int = 0
+        self.deferred: int = 0
+
+    @property
+    def limited(self) -> bool:
+        return self.requests is not None or self.seconds is not None
+
+    def start(self) -> None:
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+
+    @property
+    def spent(self) -> bool:
+        if self.requests is not None and self.used >= self.requests:
+            return True
+        return (
+            self.seconds is not None
+            and self.started_at is not None
+            and time.monotonic() - self.started_at >= self.seconds
+        )
+
+    def take(self) -> bool:
+        """Takes a request from the budget, False once it is spent."""
+        if self.spent:
+            if not self.deferred:
+                log.info(
+                    "Detail budget spent after %s requests, the other details "
+                    "are left for the next run",
+                    self.used,
+                )
+            self.deferred += 1
+            return False
+        self.used += 1
+        return True
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return dict(used=self.used, deferred=self.deferred)
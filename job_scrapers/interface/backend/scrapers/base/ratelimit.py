@@ -0,0 +1,134 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from logging import Logger
+from typing import Mapping, Optional
+from urllib.parse import urlsplit
+
+from interface.backend.logger import logdef
+
+log: Logger = logdef(__name__)
+
+THROTTLE_STATUSES: set[int] = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a Retry-After header, given either in seconds or as an http date,
+    into the number of seconds to wait.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        date: datetime = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket whose refill rate adapts to the responses of the host:
+    it is multiplied by `decrease_factor` on throttling responses and raised by
+    `increase_step` after every `recovery_after` consecutive successes.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float = 1,
+        min_rate: float = 0.1,
+        max_rate: float = 4.0,
+        increase_step: float = 0.1,
+        decrease_factor: float = 0.5,
+        recovery_after: int = 10,
+    ) -> None:
+        self.rate: float = min(max(rate, min_rate), max_rate)
+        self.burst: float = burst
+        self.min_rate: float = min_rate
+        self.max_rate: float = max_rate
+        self.increase_step: float = increase_step
+        self.decrease_factor: float = decrease_factor
+        self.recovery_after: int = recovery_after
+        self.tokens: float = burst
+        self.updated_at: float = time.monotonic()
+        self.paused_until: float = 0.0
+        self.successes: int = 0
+        self._lock: asyncio.Lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self) -> None:
+        # the lock queues the waiters in FIFO order, only the head one sleeps
+        async with self._lock:
+            while True:
+                now: float = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def throttle(self, retry_after: Optional[float] = None) -> None:
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self.successes = 0
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+    def recover(self) -> None:
+        self.successes += 1
+        if self.successes >= self.recovery_after:
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+            self.successes = 0
+
+
+class HostRateLimiter:
+    """
+    Keeps one adaptive TokenBucket per host. Call `acquire` before a request
+    and `update` with the response status and headers after it.
+    """
+
+    def __init__(self, rate: float, burst: float = 1, **bucket_kwds) -> None:
+        self.rate: float = rate
+        self.burst: float = burst
+        self.bucket_kwds: dict = bucket_kwds
+        self.buckets: dict[str, TokenBucket] = {}
+
+    def bucket(self, url: str) -> TokenBucket:
+        host: str = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate, self.burst, **self.bucket_kwds)
+        return self.buckets[host]
+
+    async def acquire(self, url: str) -> None:
+        await self.bucket(url).acquire()
+
+    def update(
+        self, url: str, status: int, headers: Optional[Mapping[str, str]] = None
+    ) -> None:
+        bucket: TokenBucket = self.bucket(url)
+        if status in THROTTLE_STATUSES:
+            retry_after: Optional[float] = parse_retry_after(
+                (headers or {}).get("Retry-After")
+            )
+            bucket.throttle(retry_after)
+            log.warning(
+                "Throttled by %s (status: %s, retry after: %s), rate now %.2f req/s",
+                urlsplit(url).netloc,
+                status,
+                retry_after,
+                bucket.rate,
+            )
+        elif status == 200:
+            bucket.recover()
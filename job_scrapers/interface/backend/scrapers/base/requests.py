@@ -1,32 +1,91 @@
 import asyncio
+import time
 from logging import Logger
 from typing import Any, Optional
 
 import aiohttp
 
+from interface.backend import codec
 from interface.backend.logger import logdef
 
+from .cache import HttpCache
+from .metrics import CrawlMetrics
+from .ratelimit import HostRateLimiter, parse_retry_after
+from .retry import HostCircuitBreaker, RetryableStatusError, RetryPolicy, StatusError
+from .singleflight import SingleFlight
 
 log: Logger = logdef(__name__)
 
 
+def decode_body(body: bytes, content_type: str, encoding: Optional[str]) -> Any:
+    if "application/json" in content_type:
+        return codec.loads(body)
+    return body.decode(encoding or "utf-8", errors="replace")
+
+
+def cached_response(entry: dict[str, Any]) -> dict[str, Any]:
+    return dict(
+        data=decode_body(entry["body"], entry["content_type"], entry["encoding"]),
+        status=entry["status"],
+        size=len(entry["body"]),
+    )
+
+
+def response_size(response: Optional[dict[str, Any]]) -> int:
+    """Size of the body of a response, in bytes."""
+    return response.get("size", 0) if response else 0
+
+
 async def _make_request(
     session: aiohttp.ClientSession,
     url: str,
     headers: Optional[dict] = None,
     cookies: Optional[dict] = None,
+    limiter: Optional[HostRateLimiter] = None,
+    cache: Optional[HttpCache] = None,
+    cache_entry: Optional[dict[str, Any]] = None,
+    retry_statuses: frozenset[int] = frozenset(),
+    metrics: Optional[CrawlMetrics] = None,
+    stage: str = "request",
 ) -> Any:
+    if cache_entry is not None:
+        headers = (headers or {}) | cache.conditional_headers(cache_entry)
+    started: float = time.monotonic()
     async with session.get(url, headers=headers, cookies=cookies) as response:
+        body: bytes = await response.read() if response.status == 200 else b""
+        if metrics is not None:
+            metrics.observe(
+                url, stage, response.status, time.monotonic() - started, len(body)
+            )
+        if limiter is not None:
+            limiter.update(url, response.status, response.headers)
+        if response.status == 304 and cache_entry is not None:
+            cache.revalidated += 1
+            await cache.touch(cache_entry)
+            return cached_response(cache_entry)
         if response.status == 200:
-            # Check the content type of the response
-            content_type: str = response.headers.get("Content-Type", "")
-            # print(f"{content_type=}")
-            if "application/json" in content_type:
-                # If it's JSON, use .json() method
-                return dict(data=await response.json(), status=response.status)
-            else:
-                # Otherwise, return as text
-                return dict(data=await response.text(), status=response.status)
+            if cache is not None:
+                cache.misses += 1
+                await cache.put(
+                    url, response.status, response.headers, response.charset, body
+                )
+            # json bodies are decoded as json, everything else as text
+            return dict(
+                data=decode_body(
+                    body,
+                    response.headers.get("Content-Type", ""),
+                    response.charset,
+                ),
+                status=response.status,
+                size=len(body),
+            )
+        if response.status in retry_statuses:
+            raise RetryableStatusError(
+                response.status,
+                parse_retry_after(response.headers.get("Retry-After")),
+            )
+        if response.status >= 400:
+            raise StatusError(response.status)
         log.error(f"Failed to fetch {url}. Status: {response.status}")
         return None
 
@@ -38,34 +97,212 @@ async def fetch(
     timeout_for_wait: Optional[float] = None,
     headers: Optional[dict] = None,
     cookies: Optional[dict] = None,
+    limiter: Optional[HostRateLimiter] = None,
+    cache: Optional[HttpCache] = None,
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[HostCircuitBreaker] = None,
+    metrics: Optional[CrawlMetrics] = None,
+    stage: str = "request",
+    single_flight: Optional[SingleFlight] = None,
 ) -> Any:
-    for i in range(retries):
+    """
+    Fetches `url`, retrying connection errors, timeouts and the statuses of
+    `policy` with exponential backoff. Every failed attempt, and any other
+    5xx, counts towards the circuit `breaker` of the host, which holds the
+    request while open. Other client errors than a 404 count as neither a
+    success nor a failure. With a `single_flight`, callers of the same url
+    share one fetch.
+    """
+    if single_flight is not None:
+        return await single_flight.do(
+            url,
+            lambda: fetch(
+                session,
+                url,
+                retries,
+                timeout_for_wait,
+                headers,
+                cookies,
+                limiter,
+                cache,
+                policy,
+                breaker,
+                metrics,
+                stage,
+            ),
+        )
+    if policy is None:
+        policy = RetryPolicy(retries=retries)
+    cache_entry: Optional[dict[str, Any]] = None
+    if cache is not None and (cache_entry := await cache.get(url)):
+        if cache.is_fresh(cache_entry):
+            cache.hits += 1
+            return cached_response(cache_entry)
+
+    for attempt in range(policy.retries):
+        if breaker is not None:
+            await breaker.wait(url)
+        if limiter is not None:
+            await limiter.acquire(url)
+        retry_after: Optional[float] = None
+        started: float = time.monotonic()
         try:
-            return await asyncio.wait_for(
-                _make_request(session, url, headers, cookies),
+            response = await asyncio.wait_for(
+                _make_request(
+                    session,
+                    url,
+                    headers,
+                    cookies,
+                    limiter,
+                    cache,
+                    cache_entry,
+                    policy.statuses,
+                    metrics,
+                    stage,
+                ),
                 timeout=timeout_for_wait,
             )
+        except RetryableStatusError as e:
+            error: Exception = e
+            retry_after = e.retry_after
+        except StatusError as e:
+            if breaker is not None:
+                if e.status >= 500:
+                    breaker.record_failure(url)
+                elif e.status == 404:
+                    breaker.record_success(url)
+            log.error(f"Failed to fetch {url}. Status: {e.status}")
+            return None
         except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-            if i == retries - 1:  # This was the last attempt
-                log.error(f"Failed to fetch {url} after {retries} attempts. Error: {e}")
-                return None
+            error = e
+            if metrics is not None:
+                metrics.observe(
+                    url, stage, type(e).__name__, time.monotonic() - started
+                )
+        else:
+            if breaker is not None:
+                breaker.record_success(url)
+            return response
 
+        if breaker is not None:
+            breaker.record_failure(url)
+        if attempt == policy.retries - 1:  # This was the last attempt
+            log.error(
+                f"Failed to fetch {url} after {policy.retries} attempts. Error: {error!r}"
+            )
+            return None
+        if metrics is not None:
+            metrics.retry(url, stage)
+        delay: float = policy.delay(attempt, retry_after)
+        log.warning(
+            "Retrying %s in %.2fs (attempt %s/%s). Error: %r",
+            url,
+            delay,
+            attempt + 1,
+            policy.retries,
+            error,
+        )
+        await asyncio.sleep(delay)
+
+
+def create_session(
+    conn_limit: int = 100,
+    conn_limit_per_host: int = 10,
+    dns_cache_ttl: int = 300,
+    keepalive_timeout: float = 30,
+    timeout_total: Optional[float] = 5,
+    timeout_connect: Optional[float] = None,
+) -> aiohttp.ClientSession:
+    """
+    Creates a session backed by a pooled connector, so that connections
+    (and their TLS handshakes) are kept alive and reused across requests.
+    Must be called from within a running event loop.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=conn_limit,
+        limit_per_host=conn_limit_per_host,
+        use_dns_cache=True,
+        ttl_dns_cache=dns_cache_ttl,
+        keepalive_timeout=keepalive_timeout,
+    )
+    timeout = aiohttp.ClientTimeout(total=timeout_total, connect=timeout_connect)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+async def fetch_all(
+    items,
+    retries=3,
+    timeout_for_session=5,
+    session: Optional[aiohttp.ClientSession] = None,
+    limiter: Optional[HostRateLimiter] = None,
+    cache: Optional[HttpCache] = None,
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[HostCircuitBreaker] = None,
+    metrics: Optional[CrawlMetrics] = None,
+    stage: str = "request",
+    single_flight: Optional[SingleFlight] = None,
+) -> list:
+    if session is not None:
+        return await _fetch_items(
+            session,
+            items,
+            retries,
+            timeout_for_session,
+            limiter,
+            cache,
+            policy,
+            breaker,
+            metrics,
+            stage,
+            single_flight,
+        )
 
-async def fetch_all(items, retries=3, timeout_for_session=5) -> list:
     timeout = aiohttp.ClientTimeout(total=timeout_for_session)
     async with aiohttp.ClientSession(timeout=timeout) as session:
-        tasks = [
-            fetch(
-                session,
-                item["url"],
-                retries,
-                timeout_for_session,
-                item.get("headers"),
-                item.get("cookies"),
-            )
-            for item in items
-        ]
-        return await asyncio.gather(*tasks)
-
+        return await _fetch_items(
+            session,
+            items,
+            retries,
+            timeout_for_session,
+            limiter,
+            cache,
+            policy,
+            breaker,
+            metrics,
+            stage,
+            single_flight,
+        )
 
 
+async def _fetch_items(
+    session: aiohttp.ClientSession,
+    items,
+    retries,
+    timeout_for_wait,
+    limiter: Optional[HostRateLimiter] = None,
+    cache: Optional[HttpCache] = None,
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[HostCircuitBreaker] = None,
+    metrics: Optional[CrawlMetrics] = None,
+    stage: str = "request",
+    single_flight: Optional[SingleFlight] = None,
+) -> list:
+    tasks = [
+        fetch(
+            session,
+            item["url"],
+            retries,
+            timeout_for_wait,
+            item.get("headers"),
+            item.get("cookies"),
+            limiter,
+            cache,
+            policy,
+            breaker,
+            metrics,
+            stage,
+            single_flight,
+        )
+        for item in items
+    ]
+    return await asyncio.gather(*tasks)
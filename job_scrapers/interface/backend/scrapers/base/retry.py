@@ -0,0 +1,136 @@
+import asyncio
+import random
+import time
+from logging import Logger
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+
+from interface.backend.logger import logdef
+
+log: Logger = logdef(__name__)
+
+RETRY_STATUSES: tuple[int, ...] = (429, 502, 503, 504)
+
+
+class StatusError(Exception):
+    """Raised for a response with an error status."""
+
+    def __init__(self, status: int) -> None:
+        super().__init__(f"Status: {status}")
+        self.status: int = status
+
+
+class RetryableStatusError(StatusError):
+    """Raised for a response whose status is worth retrying."""
+
+    def __init__(self, status: int, retry_after: Optional[float] = None) -> None:
+        super().__init__(status)
+        self.retry_after: Optional[float] = retry_after
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: before retry `attempt` (0 based)
+    it waits a random time in [0, min(max_delay, base_delay * 2 ** attempt)],
+    or the Retry-After of the response when that is longer.
+    """
+
+    def __init__(
+        self,
+        retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        statuses: Iterable[int] = RETRY_STATUSES,
+    ) -> None:
+        self.retries: int = retries
+        self.base_delay: float = base_delay
+        self.max_delay: float = max_delay
+        self.statuses: frozenset[int] = frozenset(statuses)
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        backoff: float = random.uniform(
+            0, min(self.max_delay, self.base_delay * 2**attempt)
+        )
+        return max(backoff, retry_after or 0.0)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and holds every
+    request for `reset_timeout` seconds. Then a single probe request is let
+    through: a success closes the breaker, a failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout: float = reset_timeout
+        self.failures: int = 0
+        self.opened_until: float = 0.0
+        # a probe that never reports back frees its slot after reset_timeout
+        self.probe_until: float = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self.failures >= self.failure_threshold
+
+    async def wait(self) -> None:
+        while self.is_open:
+            now: float = time.monotonic()
+            if now < self.opened_until:
+                await asyncio.sleep(self.opened_until - now)
+            elif now < self.probe_until:
+                await asyncio.sleep(min(self.probe_until - now, 0.5))
+            else:
+                self.probe_until = now + self.reset_timeout
+                return
+
+    def record_success(self) -> bool:
+        """Returns whether the breaker was open."""
+        was_open: bool = self.is_open
+        self.failures = 0
+        self.probe_until = 0.0
+        return was_open
+
+    def record_failure(self) -> bool:
+        """Returns whether the failure opened the breaker."""
+        self.failures += 1
+        self.probe_until = 0.0
+        if self.is_open:
+            self.opened_until = time.monotonic() + self.reset_timeout
+        return self.failures == self.failure_threshold
+
+
+class HostCircuitBreaker:
+    """
+    Keeps one CircuitBreaker per host. Call `wait` before a request and
+    `record_success` / `record_failure` with its outcome.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout: float = reset_timeout
+        self.breakers: dict[str, CircuitBreaker] = {}
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        host: str = urlsplit(url).netloc
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(
+                self.failure_threshold, self.reset_timeout
+            )
+        return self.breakers[host]
+
+    async def wait(self, url: str) -> None:
+        await self.breaker(url).wait()
+
+    def record_success(self, url: str) -> None:
+        if self.breaker(url).record_success():
+            log.info("Circuit of %s closed", urlsplit(url).netloc)
+
+    def record_failure(self, url: str) -> None:
+        if self.breaker(url).record_failure():
+            log.warning(
+                "Circuit of %s opened after %s consecutive failures, pausing for %ss",
+                urlsplit(url).netloc,
+                self.failure_threshold,
+                self.reset_timeout,
+            )
@@ -1,41 +1,233 @@
-import random
-import time
+import asyncio
+import os
+from contextlib import asynccontextmanager, nullcontext
 from logging import Logger
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
 
-from interface.backend import db
-from interface.backend.db.utils import check_attribute_exists
+import aiohttp
+
+from interface.backend import codec, db
+from interface.backend.config import APISettings, get_api_settings
 from interface.backend.logger import logdef
 
-from .requests import fetch_all
-from .utils import write_to_file
+from .archive import SegmentArchive
+from .cache import HttpCache
+from .metrics import REGISTRY, CrawlMetrics
+from .priority import DetailBudget, DetailPriority, DetailQueue
+from .ratelimit import HostRateLimiter
+from .requests import create_session, fetch_all, response_size
+from .retry import HostCircuitBreaker, RetryPolicy
+from .singleflight import SingleFlight
+from .writer import BackgroundWriter
 
 log: Logger = logdef(__name__)
 
+# kinds of the tasks of the work queue
+PAGE_TASK: str = "page"
+DETAIL_TASK: str = "detail"
+
+# states of the crawl frontier, kept on the request and sub request rows
+PENDING: str = "pending"
+IN_FLIGHT: str = "in_flight"
+DONE: str = "done"
+# partitions that did not cover the hits of their request
+SKIPPED: str = "skipped"
+
 
 class BaseScraper:
     CWD: Path = Path.cwd()
     NOT_IMPLEMENTED_MSG = "Needs to be defined in a subclass"
+    # job field used as the high-water mark of incremental crawls
+    JOB_DATE_FIELD: str = "publication_date"
+    # job fields that move a job up the detail queue: its company, whether
+    # the listing is paid
+    JOB_COMPANY_FIELD: Optional[str] = None
+    JOB_PAID_FIELD: Optional[str] = None
+    # querybuilder arguments that order the results newest first
+    INCREMENTAL_QUERY_PARAMS: Dict[str, Any] = {}
+    # querybuilder argument of the number of results per page
+    PAGE_SIZE_PARAM: Optional[str] = None
+    # querybuilder arguments a large request can be split by, with their options.
+    # Each job must match exactly one option, so that the partitions are
+    # disjoint and their hits add up to those of the request.
+    PARTITION_FACETS: Dict[str, List[str]] = {}
+    # querybuilder argument of a [since, until] days ago publication window
+    DATE_WINDOW_PARAM: Optional[str] = None
 
     def __init__(
         self, site_name: str, headers: Dict[str, str], cookies: Dict[str, str]
     ) -> None:
         self.SITE_NAME: str = site_name
         self.BASE_PATH: Path = self.CWD / Path(f"data/scraped/{self.SITE_NAME}")
-        self.REQUEST_DIR: Path = self.BASE_PATH / Path("requests")
-        self.SUBREQUEST_DIR: Path = self.BASE_PATH / Path("sub_requests")
-        self.JOB_DIR: Path = self.BASE_PATH / Path("Jobs")
+        self.ARCHIVE_DIR: Path = self.BASE_PATH / Path("archive")
         self.HEADERS: Dict[str, str] = {} or headers
         self.COOKIES: Dict[str, str] = {} or cookies
-        self.timeout_success: float = random.uniform(1, 1.5)
-        self.timeout_failure: float = random.uniform(3, 4.5)
+        self.config: APISettings = get_api_settings()
+        self.archive: SegmentArchive = SegmentArchive(
+            self.ARCHIVE_DIR,
+            compression=self.config.SCRAPER_ARCHIVE_COMPRESSION,
+            segment_size=self.config.SCRAPER_ARCHIVE_SEGMENT_SIZE,
+        )
+        self.writer: BackgroundWriter = BackgroundWriter(
+            self.archive, maxsize=self.config.SCRAPER_WRITER_QUEUE_SIZE
+        )
+        self.http_cache: Optional[HttpCache] = (
+            HttpCache(
+                self.BASE_PATH / Path("http_cache.db"),
+                ttl=self.config.SCRAPER_HTTP_CACHE_TTL,
+            )
+            if self.config.SCRAPER_HTTP_CACHE
+            else None
+        )
+        self.session: Optional[aiohttp.ClientSession] = None
+        # page size accepted by the site (None: its default), probed once per
+        # run, again with the next query while no query had enough hits
+        self.page_size: Optional[int] = None
+        self.page_size_probed: bool = False
+        # status, frontier and detail updates, written in batches
+        self.updates: db.BatchUpdater = db.BatchUpdater(
+            batch_size=self.config.SCRAPER_UPDATE_BATCH_SIZE,
+            flush_interval=self.config.SCRAPER_UPDATE_FLUSH_INTERVAL,
+        )
+        # global budget of in-flight requests, shared by all the queries
+        self.request_semaphore: asyncio.Semaphore = asyncio.Semaphore(
+            self.config.SCRAPER_MAX_CONCURRENCY
+        )
+        # per request id progress of the queries of a run
+        self.progress: Dict[int, Dict[str, Any]] = {}
+        self.requests_in_flight: int = 0
+        # job queues of the running detail pipelines, best ranked job first
+        self.detail_queues: set[asyncio.Queue] = set()
+        self.detail_priority: DetailPriority = DetailPriority(
+            self.JOB_DATE_FIELD,
+            self.JOB_COMPANY_FIELD,
+            self.JOB_PAID_FIELD,
+            company_days=self.config.SCRAPER_DETAIL_PRIORITY_COMPANY_DAYS,
+            paid_days=self.config.SCRAPER_DETAIL_PRIORITY_PAID_DAYS,
+        )
+        self.detail_budget: DetailBudget = DetailBudget(
+            requests=self.config.SCRAPER_DETAIL_BUDGET_REQUESTS,
+            seconds=self.config.SCRAPER_DETAIL_BUDGET_SECONDS,
+        )
+        self.metrics: CrawlMetrics = CrawlMetrics(site_name)
+        self.metrics.gauge("requests_in_flight", lambda: self.requests_in_flight)
+        self.metrics.gauge(
+            "detail_queue", lambda: sum(queue.qsize() for queue in self.detail_queues)
+        )
+        self.metrics.gauge("pending_updates", lambda: self.updates.size)
+        self.metrics.gauge("details_deferred", lambda: self.detail_budget.deferred)
+        self.metrics.gauge(
+            "writer_queue",
+            lambda: self.writer.queue.qsize() if self.writer.queue is not None else 0,
+        )
+        REGISTRY[site_name] = self.metrics
+        self.rate_limiter: HostRateLimiter = HostRateLimiter(
+            rate=self.config.SCRAPER_RATE_PER_HOST,
+            burst=self.config.SCRAPER_RATE_BURST,
+            min_rate=self.config.SCRAPER_RATE_MIN,
+            max_rate=self.config.SCRAPER_RATE_MAX,
+            increase_step=self.config.SCRAPER_RATE_INCREASE,
+            decrease_factor=self.config.SCRAPER_RATE_DECREASE_FACTOR,
+            recovery_after=self.config.SCRAPER_RATE_RECOVERY_AFTER,
+        )
+        self.retry_policy: RetryPolicy = RetryPolicy(
+            retries=self.config.SCRAPER_RETRIES,
+            base_delay=self.config.SCRAPER_RETRY_BASE_DELAY,
+            max_delay=self.config.SCRAPER_RETRY_MAX_DELAY,
+            statuses=self.config.SCRAPER_RETRY_STATUSES,
+        )
+        self.circuit_breaker: HostCircuitBreaker = HostCircuitBreaker(
+            failure_threshold=self.config.SCRAPER_BREAKER_THRESHOLD,
+            reset_timeout=self.config.SCRAPER_BREAKER_RESET_TIMEOUT,
+        )
+        # identical urls of a run are fetched once, across queries
+        self.single_flight: SingleFlight = SingleFlight(
+            maxsize=self.config.SCRAPER_MEMO_SIZE,
+            maxbytes=self.config.SCRAPER_MEMO_BYTES,
+            weigh=response_size,
+        )
+        self.metrics.gauge("requests_shared", lambda: self.single_flight.shared)
+        self.metrics.gauge("requests_memoized", lambda: self.single_flight.memo_hits)
+        # bitmaps of the row ids of the jobs found by the full crawls of the
+        # run, by the id of their root request; None once a page is missing
+        self.snapshots: Dict[int, Optional[bytearray]] = {}
+        self.expiry: Optional[db.ExpiryReconciler] = (
+            db.ExpiryReconciler(
+                grace_crawls=self.config.SCRAPER_EXPIRY_GRACE_CRAWLS,
+                grace_seconds=self.config.SCRAPER_EXPIRY_GRACE_SECONDS,
+            )
+            if self.config.SCRAPER_EXPIRY
+            else None
+        )
+
+    async def __aenter__(self) -> "BaseScraper":
+        await self.open_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        try:
+            await self.close()
+        except Exception:
+            # the exception of the crawl is the one to report
+            if exc is None:
+                raise
+
+    async def close(self) -> None:
+        """
+        Cancels the fetches in flight, closes the session and flushes every
+        pending update to the database and every pending response to the
+        archive. Every step is run even
+        when an earlier one fails; the first failure is raised at the end.
+        """
+        errors: list[Exception] = []
+        for step in (
+            self.single_flight.close,
+            self.close_session,
+            self.updates.close,
+            self.writer.close,
+            self.archive.close,
+            self.http_cache.close if self.http_cache is not None else None,
+        ):
+            if step is None:
+                continue
+            try:
+                if asyncio.iscoroutine(result := step()):
+                    await result
+            except Exception as e:
+                log.error("Failed to close %s: %r", step.__qualname__, e)
+                errors.append(e)
+        log.info("Batched updates: %s", self.updates.stats)
+        if self.http_cache is not None:
+            log.info("Http cache: %s", self.http_cache.stats)
+        if errors:
+            raise errors[0]
+
+    async def open_session(self) -> aiohttp.ClientSession:
+        """
+        Returns the scraper-lifetime session, creating it on first use.
+        Every request of the scraper goes through its connection pool.
+        """
+        if self.session is None or self.session.closed:
+            self.session = create_session(
+                conn_limit=self.config.SCRAPER_CONN_LIMIT,
+                conn_limit_per_host=self.config.SCRAPER_CONN_LIMIT_PER_HOST,
+                dns_cache_ttl=self.config.SCRAPER_DNS_CACHE_TTL,
+                keepalive_timeout=self.config.SCRAPER_KEEPALIVE_TIMEOUT,
+                timeout_total=self.config.SCRAPER_TIMEOUT_TOTAL,
+                timeout_connect=self.config.SCRAPER_TIMEOUT_CONNECT,
+            )
+        return self.session
+
+    async def close_session(self) -> None:
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
 
     async def handle_request_data(
-        self, data_json, request_obj, request_dir, extract_request_info
+        self, data_json, request_obj, archive_key, extract_request_info
     ) -> None:
-        filepath: Path = request_dir / Path(f"{request_obj.id}.json")
-        write_to_file(filepath, data_json.get("data", {}), "json")
+        await self.writer.submit(archive_key, data_json.get("data", {}))
 
         # log.info("data_json: \n%s", data_json)
 
@@ -44,34 +236,47 @@ class BaseScraper:
         # log.info("\request_obj: \n%s", request_obj)
         # log.info("\nrequest_info: \n%s", request_info)
 
-        await db.update_record_from_dict([request_obj], [request_info])
+        await self.updates.update([request_obj], [request_info])
 
-        if request_info.get("status") == 200:
-            time.sleep(self.timeout_success)
-            # request_obj.logger(log, "info", " ")
-            # request_obj.logger(log, "info", f" ({idx}/{len(jobs)})")
-        elif request_info.get("status") != 404:
-            time.sleep(self.timeout_failure)
-            # request_obj.logger(log, "error", " ")
-            # request_obj.logger(log, "error", f" ({idx}/{len(jobs)})")
-        # request_obj.logger(log, "info", "")
+    async def fetch_url(self, url, cache=None, stage: str = "request"):
+        async with self.request_semaphore:
+            self.requests_in_flight += 1
+            try:
+                req_data_dict: list[Any] = await fetch_all(
+                    [
+                        {
+                            "url": url,
+                            "headers": self.HEADERS,
+                            "cookies": self.COOKIES,
+                        },
+                    ],
+                    timeout_for_session=self.config.SCRAPER_TIMEOUT_TOTAL,
+                    session=await self.open_session(),
+                    limiter=self.rate_limiter,
+                    cache=cache,
+                    policy=self.retry_policy,
+                    breaker=self.circuit_breaker,
+                    metrics=self.metrics,
+                    stage=stage,
+                    single_flight=self.single_flight,
+                )
+            finally:
+                self.requests_in_flight -= 1
+        return req_data_dict[-1]
 
     async def handle_abstr_request(
-        self, url, request_obj, request_dir, extract_request_info
+        self,
+        url,
+        request_obj,
+        archive_key,
+        extract_request_info,
+        cache=None,
+        stage: str = "request",
     ):
-        req_data_dict: list[Any] = await fetch_all(
-            [
-                {
-                    "url": url,
-                    "headers": self.HEADERS,
-                    "cookies": self.COOKIES,
-                },
-            ],
-        )
         data_json = {}
-        if data_json := req_data_dict[-1]:
+        if data_json := await self.fetch_url(url, cache, stage):
             await self.handle_request_data(
-                data_json, request_obj, request_dir, extract_request_info
+                data_json, request_obj, archive_key, extract_request_info
             )
         else:
             log.info("Data for url: %s is empty", request_obj.url_api)
@@ -81,24 +286,29 @@ class BaseScraper:
         return await self.handle_abstr_request(
             request_obj.url_api,
             request_obj,
-            self.REQUEST_DIR,
+            f"requests/{request_obj.id}",
             self.extract_request_info,
+            stage="search",
         )
 
     async def handle_sub_request(self, request_obj, sub_request_obj):
+        await self.set_frontier([sub_request_obj], IN_FLIGHT)
         return await self.handle_abstr_request(
             sub_request_obj.url_api,
             sub_request_obj,
-            self.SUBREQUEST_DIR / Path(f"{request_obj.id}"),
+            f"sub_requests/{request_obj.id}/{sub_request_obj.id}",
             self.extract_sub_request_info,
+            stage="page",
         )
 
     async def handle_job_request(self, job):
         return await self.handle_abstr_request(
             job.url_api,
             job,
-            self.JOB_DIR / Path(f"{job.request_id}") / Path(f"{job.sub_request_id}"),
+            f"jobs/{job.job_id}",
             self.extract_job_request_info,
+            cache=self.http_cache,
+            stage="detail",
         )
 
     def extract_request_info(self, *args, **kwds):
@@ -119,33 +329,68 @@ class BaseScraper:
     def extract_job_request_info(self, *args, **kwds):
         raise NotImplementedError(self.NOT_IMPLEMENTED_MSG)
 
-    async def get_uncompleted_jobs(self, *args, **kwds):
+    def iter_uncompleted_jobs(self, *args, **kwds) -> AsyncIterator[list]:
         raise NotImplementedError(self.NOT_IMPLEMENTED_MSG)
 
     def extract_job_dict_from_job_request(self):
         raise NotImplementedError(self.NOT_IMPLEMENTED_MSG)
 
-    async def generate_sub_requests(
+    async def get_preferred_companies(self) -> set:
+        """Companies whose jobs get their details first, none by default."""
+        return set()
+
+    async def create_sub_requests(
         self,
         request_obj,
         sub_request_model,
-    ):
-        sub_requests: List[sub_request_model] = [
-            sub_request_model(
+        urls: Optional[List[str]] = None,
+    ) -> list[int]:
+        """
+        Stores the pending pages of a request as plain rows, without building
+        ORM instances, and returns their ids in page order.
+        """
+        rows: list[dict[str, Any]] = [
+            dict(
                 url_api=url,
                 query=request_obj.query,
                 location=request_obj.location,
                 days=request_obj.days,
                 request_id=request_obj.id,
+                frontier=PENDING,
+            )
+            for url in (
+                self.generate_sub_request_urls(request_obj) if urls is None else urls
             )
-            for url in self.generate_sub_request_urls(request_obj)
         ]
-        await db.save_records(sub_requests)
-        return sub_requests
+        return [
+            row.id
+            for row in await db.insert_records(sub_request_model, rows, ["id"])
+        ]
+
+    async def generate_sub_requests(
+        self,
+        request_obj,
+        sub_request_model,
+        urls: Optional[List[str]] = None,
+    ):
+        ids: list[int] = await self.create_sub_requests(
+            request_obj, sub_request_model, urls
+        )
+        if not ids:
+            return []
+        sub_requests: list = await db.get_records(sub_request_model, [("id", "in", ids)])
+        return sorted(sub_requests, key=lambda sub_request: sub_request.id)
+
+    async def get_sub_requests(self, sub_request_model, request_obj) -> list:
+        return await db.get_records(
+            sub_request_model, [("request_id", "==", request_obj.id)]
+        )
 
-    def handle_job(self, job_model, job_dict, request_obj, sub_request_obj):
-        return job_model(
-            **(self.extract_job_info(job_dict)),
+    async def set_frontier(self, records, state: str) -> None:
+        await self.updates.update(records, [dict(frontier=state)] * len(records))
+
+    def handle_job(self, job_dict, request_obj, sub_request_obj) -> dict[str, Any]:
+        return self.extract_job_info(job_dict) | dict(
             request_id=request_obj.id,
             sub_request_id=sub_request_obj.id,
         )
@@ -153,37 +398,68 @@ class BaseScraper:
     async def handle_jobs(
         self, request_obj, sub_request_obj, sub_request_data, job_model, job_id: str
     ):
-        jobs: list[job_model] = [
-            self.handle_job(job_model, job_dict, request_obj, sub_request_obj)
+        jobs: list[dict[str, Any]] = [
+            self.handle_job(job_dict, request_obj, sub_request_obj)
             for job_dict in self.extract_job_dict_from_sub_request(sub_request_data)
         ]
 
+        # the unique index on job_id skips the jobs that are already stored
+        inserted: list = await db.upsert_records(job_model, jobs, [job_id])
+
         await self.handle_duplicate_jobs(
-            request_obj, sub_request_obj, job_model, job_id, jobs
+            request_obj, sub_request_obj, len(jobs) - len(inserted)
         )
+        self.update_high_water_mark(request_obj, jobs)
 
-        return jobs
+        return jobs, inserted
 
-    async def handle_duplicate_jobs(
-        self, request_obj, sub_request_obj, job_model, job_id, jobs
-    ):
-        jobs_unique: list[job_model] = []
-        jobs_dupl: list[job_model] = []
-        for job in jobs:
-            if await check_attribute_exists(
-                job_model, job_id, value=getattr(job, job_id)
-            ):
-                jobs_dupl.append(job)
-            else:
-                jobs_unique.append(job)
+    def job_dates(self, jobs) -> list[str]:
+        return [job[self.JOB_DATE_FIELD] for job in jobs if job.get(self.JOB_DATE_FIELD)]
+
+    def update_high_water_mark(self, request_obj, jobs) -> None:
+        if dates := self.job_dates(jobs):
+            request_obj.high_water_mark = max(
+                [*dates, request_obj.high_water_mark or ""]
+            )
 
-        async with db.async_session.begin() as ses:
-            ses.add_all(jobs_unique + [sub_request_obj, request_obj])
+    async def handle_duplicate_jobs(self, request_obj, sub_request_obj, duplicates):
+        if not duplicates:
+            return
+        records: list = [
+            record
+            for record in (sub_request_obj, request_obj)
+            if record.duplicates is None
+        ]
+        await self.updates.update(
+            records, [dict(duplicates=duplicates)] * len(records)
+        )
 
-            if sub_request_obj.duplicates is None and len(jobs_dupl):
-                sub_request_obj.duplicates = 0 + len(jobs_dupl)
-            if request_obj.duplicates is None and len(jobs_dupl):
-                request_obj.duplicates = 0 + len(jobs_dupl)
+    async def fetch_sub_request(
+        self,
+        semaphore: asyncio.Semaphore,
+        lock: asyncio.Lock,
+        text: str,
+        request_obj,
+        sub_request,
+        job_model,
+        job_id,
+        on_page: Optional[Callable[[list, list], Awaitable[None]]] = None,
+    ) -> None:
+        # the slot is held until the page is processed, so that at most
+        # `concurrency` pages of a request are in memory at any time
+        async with semaphore:
+            if not (
+                sub_request_data := await self.handle_sub_request(
+                    request_obj, sub_request
+                )
+            ):
+                return
+            async with lock:
+                jobs, inserted = await self.handle_sub_request_data(
+                    request_obj, sub_request, sub_request_data, job_model, job_id, text
+                )
+                if on_page is not None:
+                    await on_page(jobs, inserted)
 
     async def handle_sub_requests(
         self,
@@ -191,38 +467,341 @@ class BaseScraper:
         sub_requests,
         job_model,
         job_id,
+        concurrency: Optional[int] = None,
+        on_page: Optional[Callable[[list, list], Awaitable[None]]] = None,
+    ) -> None:
+        """
+        Fetches the pages of a request, at most `concurrency` at a time
+        (defaults to SCRAPER_PAGE_CONCURRENCY), and processes each page as
+        soon as it arrives, one page at a time. `on_page` is awaited with the
+        jobs and the inserted rows of every page; while it blocks no further
+        page is fetched.
+        """
+        semaphore = asyncio.Semaphore(
+            concurrency or self.config.SCRAPER_PAGE_CONCURRENCY
+        )
+        lock = asyncio.Lock()
+        tasks: list[asyncio.Task] = [
+            asyncio.create_task(
+                self.fetch_sub_request(
+                    semaphore,
+                    lock,
+                    f" ({idx}/{len(sub_requests)})",
+                    request_obj,
+                    sub_request,
+                    job_model,
+                    job_id,
+                    on_page,
+                )
+            )
+            for idx, sub_request in enumerate(sub_requests, start=1)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def handle_sub_request_data(
+        self, request_obj, sub_request, sub_request_data, job_model, job_id, text
     ):
-        jobs = []
-        for idx, sub_request in enumerate(sub_requests, start=1):
-            if sub_request_data := await self.handle_sub_request(
+        sub_request_info = self.extract_sub_request_info(sub_request_data)
+
+        await self.updates.update([sub_request], [sub_request_info])
+
+        jobs, inserted = await self.handle_jobs(
+            request_obj, sub_request, sub_request_data, job_model, job_id
+        )
+        await self.set_frontier([sub_request], DONE)
+        self.metrics.count("pages")
+        self.metrics.count("jobs", len(jobs))
+        self.metrics.count("jobs_new", len(inserted))
+        if progress := self.progress.get(request_obj.id):
+            progress["pages_done"] += 1
+            progress["jobs_new"] += len(inserted)
+            progress["duplicates"] += len(jobs) - len(inserted)
+
+        if sub_request_info.get("status") == 200:
+            sub_request.logger(log, "info", text)
+        elif sub_request_info.get("status") != 404:
+            sub_request.logger(log, "error", text)
+
+        return jobs, inserted
+
+    async def handle_sub_requests_incremental(
+        self,
+        request_obj,
+        sub_request_model,
+        job_model,
+        job_id,
+        high_water_mark: Optional[str] = None,
+        sub_requests: Optional[list] = None,
+        on_page: Optional[Callable[[list, list], Awaitable[None]]] = None,
+    ) -> None:
+        """
+        Walks the pages of a newest first request one by one, creating each
+        sub request only when it is fetched, and stops after the first page
+        that holds no new job or reaches past the `high_water_mark` of the
+        previous crawl of the same query. Pages among `sub_requests` that
+        are done already are skipped. `on_page` is awaited as in
+        `handle_sub_requests`.
+        """
+        existing: Dict[str, Any] = {
+            sub_request.url_api: sub_request for sub_request in sub_requests or []
+        }
+        urls: list[str] = self.generate_sub_request_urls(request_obj)
+        for idx, url in enumerate(urls, start=1):
+            if (sub_request := existing.get(url)) is None:
+                [sub_request] = await self.generate_sub_requests(
+                    request_obj, sub_request_model, [url]
+                )
+            elif sub_request.frontier == DONE:
+                continue
+            if not (
+                sub_request_data := await self.handle_sub_request(
+                    request_obj, sub_request
+                )
+            ):
+                continue
+
+            page_jobs, inserted = await self.handle_sub_request_data(
                 request_obj,
                 sub_request,
+                sub_request_data,
+                job_model,
+                job_id,
+                f" ({idx}/{len(urls)})",
+            )
+            if on_page is not None:
+                await on_page(page_jobs, inserted)
+
+            dates: list[str] = self.job_dates(page_jobs)
+            if not inserted or (
+                high_water_mark and dates and min(dates) <= high_water_mark
             ):
-                sub_request_info = self.extract_sub_request_info(sub_request_data)
+                log.info(
+                    "Incremental crawl of %s stopped at page %s/%s",
+                    request_obj.url_api,
+                    idx,
+                    len(urls),
+                )
+                break
 
-                await db.update_record_from_dict([sub_request], [sub_request_info])
+    async def save_high_water_mark(self, request_obj) -> None:
+        await self.updates.update(
+            [request_obj], [dict(high_water_mark=request_obj.high_water_mark)]
+        )
 
-                jobs.append(
-                    await self.handle_jobs(
-                        request_obj, sub_request, sub_request_data, job_model, job_id
-                    )
+    async def get_high_water_mark(self, request_model, request_obj) -> Optional[str]:
+        return await db.get_max_value(
+            request_model,
+            "high_water_mark",
+            [
+                ("query", "==", request_obj.query),
+                ("location", "==", request_obj.location),
+                ("days", "==" if request_obj.days is not None else "is", request_obj.days),
+                (
+                    "facets",
+                    "==" if request_obj.facets is not None else "is",
+                    request_obj.facets,
+                ),
+                ("id", "!=", request_obj.id),
+            ],
+        )
+
+    def partitions(self, request_obj, facets: Dict[str, Any]) -> List[List[Dict]]:
+        """
+        Candidate splits of a request, each a list of the facets of its
+        partitions: the halves of its date window first, since they always
+        cover every hit, then one split per facet it is not narrowed by yet.
+        """
+        splits: List[List[Dict]] = []
+        window: Optional[List[int]] = facets.get(self.DATE_WINDOW_PARAM) or (
+            [request_obj.days, 0] if request_obj.days else None
+        )
+        if self.DATE_WINDOW_PARAM and window and window[0] - window[1] >= 2:
+            since, until = window
+            middle: int = (since + until) // 2
+            splits.append(
+                [
+                    facets | {self.DATE_WINDOW_PARAM: [since, middle]},
+                    facets | {self.DATE_WINDOW_PARAM: [middle, until]},
+                ]
+            )
+        splits.extend(
+            [facets | {name: [option]} for option in options]
+            for name, options in self.PARTITION_FACETS.items()
+            if name not in facets
+        )
+        return splits
+
+    async def partition_request(
+        self, request_obj, request_model, querybuilder=None
+    ) -> Optional[list]:
+        """
+        Splits a request with more than SCRAPER_PARTITION_THRESHOLD hits into
+        partitions and returns them, with their first page fetched. A split
+        is only used when each of its partitions is smaller than the request
+        and together they cover all of its hits, which holds as the partitions
+        are disjoint.
+        Returns None when the request is crawled as is.
+        """
+        if querybuilder is None or (
+            (request_obj.total_hits or 0) <= self.config.SCRAPER_PARTITION_THRESHOLD
+        ):
+            return None
+        # partitioned by an interrupted run
+        if partitions := await db.get_records(
+            request_model, [("parent_id", "==", request_obj.id)]
+        ):
+            return [
+                partition
+                for partition in partitions
+                if partition.frontier not in (DONE, SKIPPED)
+            ]
+
+        facets: Dict[str, Any] = codec.loads(request_obj.facets or "{}")
+        query: Dict[str, Any] = dict(
+            query=request_obj.query, location=request_obj.location, days=request_obj.days
+        )
+        for split in self.partitions(request_obj, facets):
+            partitions = await self.create_requests(
+                [query | partition_facets for partition_facets in split],
+                querybuilder,
+                request_model,
+                request_obj.incremental,
+                self.query_params(request_obj.incremental),
+                parent=request_obj,
+            )
+            await asyncio.gather(*(self.handle_request(p) for p in partitions))
+            covered: int = sum(p.total_hits or 0 for p in partitions)
+            # every partition narrows the request down and together they cover it
+            if (
+                all(p.status == 200 for p in partitions)
+                and max(p.total_hits or 0 for p in partitions) < request_obj.total_hits
+                and covered >= request_obj.total_hits
+            ):
+                log.info(
+                    "Split %s hits of %s into %s partitions of %s hits",
+                    request_obj.total_hits,
+                    request_obj.url_api,
+                    len(partitions),
+                    [p.total_hits for p in partitions],
                 )
+                self.metrics.count("partitions", len(partitions))
+                return partitions
+            log.info(
+                "Partitions %s cover %s of the %s hits of %s, not used",
+                [p.facets for p in partitions],
+                covered,
+                request_obj.total_hits,
+                request_obj.url_api,
+            )
+            await self.set_frontier(partitions, SKIPPED)
+        log.warning(
+            "%s has %s hits and cannot be split further",
+            request_obj.url_api,
+            request_obj.total_hits,
+        )
+        return None
+
+    async def handle_job_details(self, job) -> None:
+        await self.handle_job_request(job)
+        job.logger(log, "info", " ")
+        self.metrics.count("details")
+        if progress := self.progress.get(job.request_id):
+            progress["details_done"] += 1
 
-                if sub_request_info.get("status") == 200:
-                    time.sleep(self.timeout_success)
-                    sub_request.logger(log, "info", f" ({idx}/{len(sub_requests)})")
-                elif sub_request_info.get("status") != 404:
-                    time.sleep(self.timeout_failure)
-                    sub_request.logger(log, "error", f" ({idx}/{len(sub_requests)})")
+    async def detail_fetcher(self, queue: asyncio.Queue) -> None:
+        while True:
+            job = await queue.get()
+            try:
+                # over budget the job is left uncompleted for the next run
+                if self.detail_budget.take():
+                    await self.handle_job_details(job)
+            except Exception as e:
+                log.error("Failed to fetch the details of %s: %r", job.url_api, e)
+            finally:
+                queue.task_done()
 
-        return jobs
+    @asynccontextmanager
+    async def detail_pipeline(
+        self, concurrency: Optional[int] = None
+    ) -> AsyncIterator[asyncio.Queue]:
+        """
+        Starts `concurrency` detail fetchers (defaults to
+        SCRAPER_DETAIL_CONCURRENCY) and yields the bounded queue they consume
+        jobs from, best ranked first. Putting a job blocks while the queue is
+        full, which holds back the producer. On exit the queued jobs are
+        drained.
+        """
+        queue: asyncio.Queue = DetailQueue(
+            self.detail_priority, self.config.SCRAPER_DETAIL_QUEUE_SIZE
+        )
+        fetchers: list[asyncio.Task] = [
+            asyncio.create_task(self.detail_fetcher(queue))
+            for _ in range(concurrency or self.config.SCRAPER_DETAIL_CONCURRENCY)
+        ]
+        self.detail_queues.add(queue)
+        try:
+            yield queue
+            await queue.join()
+        finally:
+            self.detail_queues.discard(queue)
+            for fetcher in fetchers:
+                fetcher.cancel()
+            await asyncio.gather(*fetchers, return_exceptions=True)
+
+    async def queue_details(
+        self, queue: asyncio.Queue, job_model, job_id, inserted: list
+    ) -> None:
+        """Queues the jobs a page inserted for their details."""
+        if not inserted:
+            return
+        for job in await db.get_records(
+            job_model,
+            [(job_id, "in", [row[0] for row in inserted]), ("status", "is", None)],
+        ):
+            await queue.put(job)
 
-    async def handle_job_requests(self):
-        jobs = await self.get_uncompleted_jobs()
-        for idx, job in enumerate(jobs, start=1):
-            await self.handle_job_request(job)
-            job.logger(log, "info", " ")
-            
+    async def handle_job_requests(self, request_id: Optional[int] = None):
+        """
+        Fetches the details of the uncompleted jobs, only those found by
+        `request_id` when given, best ranked first and while the detail
+        budget lasts.
+        """
+        await self.updates.flush()
+        async with self.detail_pipeline() as queue:
+            async for job in self.ranked_uncompleted_jobs(request_id):
+                if self.detail_budget.spent:
+                    break
+                await queue.put(job)
+
+    async def ranked_uncompleted_jobs(
+        self, request_id: Optional[int] = None
+    ) -> AsyncIterator:
+        """
+        Yields the uncompleted jobs best ranked first. A first pass over them
+        keeps only their ranks and ids, a second one loads them again in
+        chunks of that order, so that a chunk of records is held at a time.
+        """
+        ranked: list[tuple[float, int]] = []
+        async for jobs in self.iter_uncompleted_jobs(request_id=request_id):
+            ranked.extend((self.detail_priority.rank(job), job.id) for job in jobs)
+        ranked.sort()
+        chunk_size: int = self.config.SCRAPER_RECORD_CHUNK_SIZE
+        for i in range(0, len(ranked), chunk_size):
+            order: Dict[int, int] = {
+                job_id: idx for idx, (_, job_id) in enumerate(ranked[i : i + chunk_size])
+            }
+            # jobs completed in the meantime are not loaded again
+            jobs: list = [
+                job
+                async for chunk in self.iter_uncompleted_jobs(ids=list(order))
+                for job in chunk
+            ]
+            for job in sorted(jobs, key=lambda job: order[job.id]):
+                yield job
 
     async def main(
         self,
@@ -232,40 +811,686 @@ class BaseScraper:
         sub_request_model,
         job_model,
         job_id,
+        incremental: Optional[bool] = None,
     ):
+        """
+        Crawls every query of `query_list`. In incremental mode (defaults to
+        SCRAPER_INCREMENTAL) results are requested newest first and paging
+        stops at the jobs that are already stored.
+
+        The requests of all the queries are stored as pending up front, so
+        an interrupted crawl can be picked up again with `resume`.
+        """
+        if incremental is None:
+            incremental = self.config.SCRAPER_INCREMENTAL
+
         await db.init()
+        # the page size probe of create_requests is part of the run
+        self.metrics.start()
+
+        request_objs: list = await self.create_requests(
+            query_list,
+            querybuilder,
+            request_model,
+            incremental,
+            self.query_params(incremental),
+        )
+
+        await self.crawl(
+            request_objs,
+            request_model,
+            sub_request_model,
+            job_model,
+            job_id,
+            querybuilder,
+        )
 
-        for idx, query_dict in enumerate(query_list, start=1):
-            query = query_dict["query"]
-            location = query_dict["location"]
-            days = query_dict["days"]
+    def query_params(self, incremental: bool = False) -> Dict[str, Any]:
+        return dict(self.INCREMENTAL_QUERY_PARAMS) if incremental else {}
 
-            request_obj: request_model = await db.create_record(
-                request_model,
-                query=query,
-                location=location,
-                days=days,
-                url_api=querybuilder(query=query, location=location, days=days).url_api,
+    async def create_requests(
+        self,
+        query_list,
+        querybuilder,
+        request_model,
+        incremental: bool = False,
+        query_params: Optional[Dict[str, Any]] = None,
+        parent=None,
+    ) -> list:
+        """
+        Stores a pending request per query of `query_list`, with pages of the
+        probed page size. Arguments of a query besides query, location and
+        days are kept as its facets; `parent` is the request they partition.
+        """
+        query_params = dict(query_params or {})
+        if query_list and (
+            page_size := await self.probe_page_size(
+                querybuilder, query_list[0], query_params
             )
+        ):
+            query_params[self.PAGE_SIZE_PARAM] = page_size
+        request_objs: list = [
+            request_model(
+                query=query_dict["query"],
+                location=query_dict["location"],
+                days=query_dict["days"],
+                url_api=querybuilder(**query_dict, **query_params).url_api,
+                incremental=incremental,
+                frontier=PENDING,
+                parent_id=parent.id if parent is not None else None,
+                facets=self.dump_facets(query_dict),
+            )
+            for query_dict in query_list
+        ]
+        await db.save_records(request_objs)
+        return request_objs
+
+    @staticmethod
+    def dump_facets(query_dict: Dict[str, Any]) -> Optional[str]:
+        facets: Dict[str, Any] = {
+            k: v for k, v in query_dict.items() if k not in ("query", "location", "days")
+        }
+        return codec.dumps(facets).decode() if facets else None
+
+    async def probe_page_size(
+        self, querybuilder, query_dict, query_params: Dict[str, Any]
+    ) -> Optional[int]:
+        """
+        Returns the largest of SCRAPER_PAGE_SIZES whose pages the site serves
+        in full, probed once per run with the first page of `query_dict`.
+        A size is accepted only when the query has enough hits to fill a page
+        of it; while none does the site default is kept and the next query
+        probes again. The accepted probe is that very page, so crawling it
+        afterwards is served from the single flight memo.
+        """
+        if self.PAGE_SIZE_PARAM is None or self.page_size_probed:
+            return self.page_size
+        untested: bool = False
+        hits: Optional[int] = None
+        for size in sorted(self.config.SCRAPER_PAGE_SIZES, reverse=True):
+            if hits is not None and hits < size:
+                untested = True
+                continue
+            url: str = querybuilder(
+                **query_dict, **query_params, **{self.PAGE_SIZE_PARAM: size}
+            ).url_api
+            if not (data := await self.fetch_url(url, stage="search")):
+                log.info("Could not probe the page size with %s", url)
+                continue
+            info: Dict[str, Any] = self.extract_request_info(data)
+            hits = info.get("total_hits") or 0
+            if hits < size:
+                untested = True
+                continue
+            if (info.get("actual_hits") or 0) >= size:
+                self.page_size = size
+                break
+            log.info(
+                "Pages of %s results are cut to %s, trying smaller ones",
+                size,
+                info.get("actual_hits"),
+            )
+        else:
+            if untested:
+                log.info("Too few hits to probe the page size with %s", query_dict)
+                return None
+        self.page_size_probed = True
+        log.info("Requesting pages of %s results", self.page_size or "default")
+        return self.page_size
 
-            if request_data := await self.handle_request(request_obj):
-                request_obj.logger(log, 'info', f' ({idx}/{len(query_list)})')
-                if sub_requests := await self.generate_sub_requests(
+    async def resume(
+        self, request_model, sub_request_model, job_model, job_id, querybuilder=None
+    ):
+        """
+        Picks up the crawls that were interrupted: the requests that are still
+        pending or in flight, the pages of them that are not done and every
+        job whose details were not fetched yet. The partitions of a resumed
+        request are picked up through it.
+        """
+        await db.init()
+        self.metrics.start()
+
+        request_objs: list = await db.get_records(
+            request_model, [("frontier", "in", [PENDING, IN_FLIGHT])]
+        )
+        ids: set = {request_obj.id for request_obj in request_objs}
+        request_objs = [
+            request_obj
+            for request_obj in request_objs
+            if getattr(request_obj, "parent_id", None) not in ids
+        ]
+        log.info("Resuming %s requests", len(request_objs))
+
+        await self.crawl(
+            request_objs,
+            request_model,
+            sub_request_model,
+            job_model,
+            job_id,
+            querybuilder,
+        )
+
+    async def crawl(
+        self,
+        request_objs,
+        request_model,
+        sub_request_model,
+        job_model,
+        job_id,
+        querybuilder=None,
+    ):
+        self.detail_budget.start()
+        self.detail_priority.companies = await self.get_preferred_companies()
+        semaphore = asyncio.Semaphore(self.config.SCRAPER_QUERY_CONCURRENCY)
+
+        async def run_query(idx: int, request_obj):
+            async with semaphore:
+                await self.handle_query(
+                    idx,
+                    len(request_objs),
+                    request_obj,
+                    request_model,
+                    sub_request_model,
+                    job_model,
+                    job_id,
+                    querybuilder,
+                )
+
+        async with self:
+            results = await asyncio.gather(
+                *(
+                    run_query(idx, request_obj)
+                    for idx, request_obj in enumerate(request_objs, start=1)
+                ),
+                return_exceptions=True,
+            )
+            for request_obj, result in zip(request_objs, results):
+                if isinstance(result, Exception):
+                    log.error("Query %s failed: %r", request_obj.query, result)
+
+            # details left over by failed queries or earlier runs
+            await self.handle_job_requests()
+            self.log_progress()
+            log.info("%s", self.metrics.summary())
+            self.metrics.save(self.BASE_PATH / Path("metrics.json"))
+
+    async def handle_query(
+        self,
+        idx: int,
+        total: int,
+        request_obj,
+        request_model,
+        sub_request_model,
+        job_model,
+        job_id,
+        querybuilder=None,
+        root_id: Optional[int] = None,
+    ):
+        """
+        Crawls a single request, skipping the work an earlier run has done:
+        the request itself once it got a 200 and the pages that are done.
+        The request is done once the details of its jobs are fetched, or
+        left to the ranked pass of a detail budget; when its first page
+        cannot be fetched it stays in flight. A request with
+        too many hits is crawled through its partitions instead, in parallel.
+
+        A full crawl of a query, done within the run, leaves a snapshot of
+        the jobs it found, which expires the jobs that vanished since.
+        """
+        if root_id is None and self.full_crawl(request_obj):
+            self.snapshots[request_obj.id] = bytearray()
+            try:
+                await self.handle_query(
+                    idx,
+                    total,
+                    request_obj,
+                    request_model,
+                    sub_request_model,
+                    job_model,
+                    job_id,
+                    querybuilder,
+                    request_obj.id,
+                )
+            finally:
+                seen: Optional[bytearray] = self.snapshots.pop(request_obj.id, None)
+            if seen and request_obj.frontier == DONE:
+                await self.reconcile_expiry(request_obj, job_model, seen)
+            return
+        if root_id is None:
+            root_id = request_obj.id
+
+        await self.set_frontier([request_obj], IN_FLIGHT)
+
+        if request_obj.status != 200 and not await self.handle_request(request_obj):
+            log.info("No data found for url: %s", request_obj.url_api)
+            self.drop_snapshot(root_id)
+            return
+
+        request_obj.logger(log, "info", f" ({idx}/{total})")
+
+        if (
+            partitions := await self.partition_request(
+                request_obj, request_model, querybuilder
+            )
+        ) is not None:
+            results = await asyncio.gather(
+                *(
+                    self.handle_query(
+                        idx,
+                        total,
+                        partition,
+                        request_model,
+                        sub_request_model,
+                        job_model,
+                        job_id,
+                        querybuilder,
+                        root_id,
+                    )
+                    for partition in partitions
+                ),
+                return_exceptions=True,
+            )
+            failed: list = [result for result in results if isinstance(result, Exception)]
+            for result in failed:
+                log.error("Partition of %s failed: %r", request_obj.url_api, result)
+            if not failed:
+                await self.set_frontier([request_obj], DONE)
+            else:
+                self.drop_snapshot(root_id)
+            return
+
+        self.progress[request_obj.id] = dict(
+            query=request_obj.query,
+            pages=request_obj.num_pages,
+            pages_done=0,
+            jobs_new=0,
+            duplicates=0,
+            details_done=0,
+        )
+
+        sub_requests: list = await self.get_sub_requests(sub_request_model, request_obj)
+        # the jobs of every page stream into the detail fetchers while the
+        # next pages are downloading. With a detail budget they are left to
+        # the ranked pass over the jobs of every query at the end of the run.
+        async with (
+            nullcontext() if self.detail_budget.limited else self.detail_pipeline()
+        ) as details:
+            if details is not None:
+                # jobs stored by an interrupted run of this request
+                async for job in self.ranked_uncompleted_jobs(request_obj.id):
+                    await details.put(job)
+
+            async def on_page(jobs: list, inserted: list) -> None:
+                if (seen := self.snapshots.get(root_id)) is not None:
+                    db.expiry.set_bits(
+                        seen,
+                        await db.get_ids(
+                            job_model, job_id, [job[job_id] for job in jobs]
+                        ),
+                    )
+                if details is not None:
+                    await self.queue_details(details, job_model, job_id, inserted)
+
+            if request_obj.incremental:
+                await self.handle_sub_requests_incremental(
+                    request_obj,
+                    sub_request_model,
+                    job_model,
+                    job_id,
+                    await self.get_high_water_mark(request_model, request_obj),
+                    sub_requests,
+                    on_page,
+                )
+            elif sub_requests := sub_requests or await self.generate_sub_requests(
+                request_obj, sub_request_model
+            ):
+                if any(sub_request.frontier == DONE for sub_request in sub_requests):
+                    # the jobs of the pages of an earlier run are not seen
+                    self.drop_snapshot(root_id)
+                await self.handle_sub_requests(
+                    request_obj,
+                    [
+                        sub_request
+                        for sub_request in sub_requests
+                        if sub_request.frontier != DONE
+                    ],
+                    job_model,
+                    job_id,
+                    on_page=on_page,
+                )
+                if any(sub_request.status != 200 for sub_request in sub_requests):
+                    self.drop_snapshot(root_id)
+            else:
+                log.info("No sub_request were generated for %s", request_obj.url_api)
+
+        await self.save_high_water_mark(request_obj)
+        await self.set_frontier([request_obj], DONE)
+
+    def full_crawl(self, request_obj) -> bool:
+        """
+        Whether crawling the request sees every job of its query: it is not
+        a partition, does not stop at stored jobs and has no date window,
+        whose jobs drop out as they age.
+        """
+        return (
+            self.expiry is not None
+            and getattr(request_obj, "parent_id", None) is None
+            and not request_obj.incremental
+            and request_obj.days is None
+        )
+
+    def drop_snapshot(self, root_id: int) -> None:
+        if root_id in self.snapshots:
+            self.snapshots[root_id] = None
+
+    @staticmethod
+    def snapshot_key(request_obj) -> str:
+        return codec.dumps(
+            dict(
+                query=request_obj.query,
+                location=request_obj.location,
+                facets=request_obj.facets,
+            )
+        ).decode()
+
+    async def reconcile_expiry(self, request_obj, job_model, seen: bytearray) -> None:
+        try:
+            expired: int = await self.expiry.reconcile(
+                self.SITE_NAME,
+                self.snapshot_key(request_obj),
+                request_obj.id,
+                job_model,
+                seen,
+            )
+        except Exception as e:
+            log.error("Failed to expire the jobs of %s: %r", request_obj.url_api, e)
+            return
+        self.metrics.count("jobs_expired", expired)
+
+    def log_progress(self) -> None:
+        for request_id, progress in self.progress.items():
+            log.info("Request %s: %s", request_id, progress)
+
+    async def enqueue_tasks(
+        self, task_model, kind: str, keys: list, request_id: Optional[int] = None
+    ) -> None:
+        """
+        Queues a pending task per key. A task that is done or failed already
+        is queued again, with its attempts reset; a pending or leased one is
+        left alone.
+        """
+        await db.upsert_records(
+            task_model,
+            [
+                dict(
+                    site=self.SITE_NAME,
+                    kind=kind,
+                    key=str(key),
+                    request_id=request_id,
+                    state="pending",
+                    attempts=0,
+                    lease_owner=None,
+                    lease_expires_at=None,
+                )
+                for key in keys
+            ],
+            ["site", "kind", "key"],
+            ["state", "attempts", "lease_owner", "lease_expires_at"],
+            update_where=task_model.state.in_(["failed", "done"]),
+        )
+
+    async def distribute(
+        self,
+        query_list,
+        querybuilder,
+        request_model,
+        sub_request_model,
+        job_model,
+        job_id,
+        task_model,
+        workers: Optional[int] = None,
+    ):
+        """
+        Crawls `query_list` with `workers` processes (defaults to
+        SCRAPER_WORKERS). The first page of every query is fetched here and
+        the other pages are queued as tasks. The workers lease the pages,
+        queue the details of the jobs they find and lease those in turn.
+        Incremental crawling is not supported in this mode.
+        """
+        from .workers import launch_workers
+
+        await db.init()
+
+        request_objs: list = await self.create_requests(
+            query_list, querybuilder, request_model
+        )
+        # the requests and their partitions, whose pages are queued
+        queued: list = []
+        async with self:
+
+            async def queue_request(request_obj, fetched: bool = False):
+                queued.append(request_obj)
+                await self.set_frontier([request_obj], IN_FLIGHT)
+                if not fetched and not await self.handle_request(request_obj):
+                    log.info("No data found for url: %s", request_obj.url_api)
+                elif (
+                    partitions := await self.partition_request(
+                        request_obj, request_model, querybuilder
+                    )
+                ) is not None:
+                    await asyncio.gather(
+                        *(queue_request(partition, True) for partition in partitions)
+                    )
+                elif ids := await self.create_sub_requests(
                     request_obj, sub_request_model
                 ):
-                    jobs = await self.handle_sub_requests(
-                        request_obj,
-                        sub_requests,
+                    await self.enqueue_tasks(task_model, PAGE_TASK, ids, request_obj.id)
+
+            await asyncio.gather(*(queue_request(obj) for obj in request_objs))
+            # details left over by earlier runs
+            async for jobs in self.iter_uncompleted_jobs():
+                await self.enqueue_tasks(
+                    task_model, DETAIL_TASK, [getattr(job, job_id) for job in jobs]
+                )
+
+        exitcodes: list = await asyncio.to_thread(
+            launch_workers,
+            type(self),
+            dict(headers=self.HEADERS, cookies=self.COOKIES),
+            workers or self.config.SCRAPER_WORKERS,
+        )
+        log.info("Workers exited with %s", exitcodes)
+        if not await db.count_tasks(task_model, self.SITE_NAME, ["pending", "leased"]):
+            # requests with failed pages, and the requests they partition,
+            # stay in flight for resume to pick up
+            failed: set = {
+                task.request_id
+                for task in await db.get_records(
+                    task_model,
+                    [
+                        ("site", "==", self.SITE_NAME),
+                        ("kind", "==", PAGE_TASK),
+                        ("state", "==", "failed"),
+                    ],
+                )
+            }
+            parents: Dict[int, Optional[int]] = {
+                obj.id: getattr(obj, "parent_id", None) for obj in queued
+            }
+            for request_id in list(failed):
+                while (request_id := parents.get(request_id)) is not None:
+                    failed.add(request_id)
+            failed &= parents.keys()
+            if failed:
+                log.warning("Requests %s have failed pages", sorted(failed))
+            await self.set_frontier(
+                [obj for obj in queued if obj.status == 200 and obj.id not in failed],
+                DONE,
+            )
+            await self.updates.close()
+
+    def as_worker(self, name: str, workers: int = 1) -> str:
+        """
+        Prepares the scraper to run as one of `workers` processes: the archive
+        and the metrics get their own files and the per-host rate is shared.
+        Returns the lease owner of the worker.
+        """
+        self.archive = SegmentArchive(
+            self.ARCHIVE_DIR / Path(name),
+            compression=self.config.SCRAPER_ARCHIVE_COMPRESSION,
+            segment_size=self.config.SCRAPER_ARCHIVE_SEGMENT_SIZE,
+        )
+        self.writer = BackgroundWriter(
+            self.archive, maxsize=self.config.SCRAPER_WRITER_QUEUE_SIZE
+        )
+        self.rate_limiter = HostRateLimiter(
+            rate=self.config.SCRAPER_RATE_PER_HOST / workers,
+            burst=self.config.SCRAPER_RATE_BURST,
+            min_rate=self.config.SCRAPER_RATE_MIN / workers,
+            max_rate=self.config.SCRAPER_RATE_MAX / workers,
+            increase_step=self.config.SCRAPER_RATE_INCREASE / workers,
+            decrease_factor=self.config.SCRAPER_RATE_DECREASE_FACTOR,
+            recovery_after=self.config.SCRAPER_RATE_RECOVERY_AFTER,
+        )
+        self.metrics.name = f"{self.SITE_NAME}-{name}"
+        return f"{name}:{os.getpid()}"
+
+    async def work(
+        self,
+        owner: str,
+        request_model,
+        sub_request_model,
+        job_model,
+        job_id,
+        task_model,
+    ):
+        """
+        Worker loop: leases pages first, then job details, until no task is
+        pending or leased by another worker any more.
+        """
+        self.metrics.start()
+        async with self:
+            while True:
+                if tasks := await self.lease_tasks(task_model, PAGE_TASK, owner):
+                    await self.work_pages(
+                        owner,
+                        tasks,
+                        request_model,
+                        sub_request_model,
                         job_model,
                         job_id,
+                        task_model,
                     )
-                    await self.handle_job_requests()
+                elif tasks := await self.lease_tasks(task_model, DETAIL_TASK, owner):
+                    await self.work_details(owner, tasks, job_model, job_id, task_model)
+                elif await db.count_tasks(
+                    task_model, self.SITE_NAME, ["pending", "leased"]
+                ):
+                    # wait for the leases of the other workers to settle or expire
+                    await asyncio.sleep(1)
                 else:
-                    log.info("No sub_request were generated for %s", request_obj.url)
-                    if request_obj.status == 200:
-                        time.sleep(1)
-                    else:
-                        time.sleep(3)
-            else:
-                log.info("No data found for url: %s", request_obj.url)
-            
+                    break
+            log.info("%s", self.metrics.summary())
+            self.metrics.save(
+                self.BASE_PATH / Path(f"metrics-{self.metrics.name}.json")
+            )
+
+    async def lease_tasks(self, task_model, kind: str, owner: str) -> list:
+        return await db.lease_tasks(
+            task_model,
+            self.SITE_NAME,
+            kind,
+            owner,
+            self.config.SCRAPER_LEASE_BATCH,
+            self.config.SCRAPER_LEASE_SECONDS,
+        )
+
+    async def settle_tasks(self, task_model, owner: str, tasks, done_keys: set) -> None:
+        """Completes the tasks of `done_keys` and gives the others back."""
+        done: list = [task.id for task in tasks if task.key in done_keys]
+        retry: list = [
+            task.id
+            for task in tasks
+            if task.key not in done_keys
+            and task.attempts < self.config.SCRAPER_TASK_MAX_ATTEMPTS
+        ]
+        failed: list = [
+            task.id for task in tasks if task.id not in done and task.id not in retry
+        ]
+        await db.settle_tasks(task_model, done, owner, "done")
+        await db.settle_tasks(task_model, retry, owner, "pending")
+        await db.settle_tasks(task_model, failed, owner, "failed")
+
+    async def work_pages(
+        self,
+        owner,
+        tasks,
+        request_model,
+        sub_request_model,
+        job_model,
+        job_id,
+        task_model,
+    ):
+        sub_requests: list = await db.get_records(
+            sub_request_model, [("id", "in", [int(task.key) for task in tasks])]
+        )
+        request_objs: Dict[int, Any] = {
+            request_obj.id: request_obj
+            for request_obj in await db.get_records(
+                request_model,
+                [("id", "in", list({sub.request_id for sub in sub_requests}))],
+            )
+        }
+
+        async def work_request(request_obj, pages):
+            async def on_page(jobs: list, inserted: list) -> None:
+                await self.enqueue_tasks(
+                    task_model,
+                    DETAIL_TASK,
+                    [job[job_id] for job in jobs],
+                    request_obj.id,
+                )
+
+            await self.handle_sub_requests(
+                request_obj, pages, job_model, job_id, on_page=on_page
+            )
+
+        await asyncio.gather(
+            *(
+                work_request(
+                    request_obj,
+                    [sub for sub in sub_requests if sub.request_id == request_id],
+                )
+                for request_id, request_obj in request_objs.items()
+            )
+        )
+        await self.updates.flush()
+        await self.settle_tasks(
+            task_model,
+            owner,
+            tasks,
+            {str(sub.id) for sub in sub_requests if sub.frontier == DONE},
+        )
+
+    async def work_details(self, owner, tasks, job_model, job_id, task_model):
+        # jobs whose details are stored already (by any worker) are done
+        jobs: list = await db.get_records(
+            job_model,
+            [(job_id, "in", [task.key for task in tasks]), ("status", "is", None)],
+        )
+        pending: set = {getattr(job, job_id) for job in jobs}
+
+        async def work_job(job) -> Optional[str]:
+            if await self.handle_job_request(job):
+                self.metrics.count("details")
+                return getattr(job, job_id)
+            return None
+
+        fetched: set = set(await asyncio.gather(*(work_job(job) for job in jobs)))
+        await self.updates.flush()
+        await self.settle_tasks(
+            task_model,
+            owner,
+            tasks,
+            {task.key for task in tasks if task.key not in pending} | fetched,
+        )
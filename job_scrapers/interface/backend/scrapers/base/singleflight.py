@@ -0,0 +1,116 @@
+import asyncio
+from collections import OrderedDict
+from logging import Logger
+from typing import Any, Awaitable, Callable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from interface.backend.logger import logdef
+
+log: Logger = logdef(__name__)
+
+DEFAULT_PORTS: dict[str, int] = {"http": 80, "https": 443}
+
+
+def canonical_url(url: str) -> str:
+    """
+    Normalizes the parts of `url` that do not change the response: the case
+    of the scheme and host, a default port, the order of the query
+    parameters and the fragment.
+    """
+    parts = urlsplit(url)
+    scheme: str = parts.scheme.lower()
+    netloc: str = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parts.port}"
+    if parts.username:
+        netloc = f"{parts.username}@{netloc}"
+    query: str = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+class SingleFlight:
+    """
+    Fetches each canonical url at most once at a time and at most once per
+    run. Concurrent callers of the same url share the result of a single
+    fetch, later callers get it from a memo of the last `maxsize` results,
+    whose `weigh`ts add up to at most `maxbytes` (failed fetches, which
+    return None, are not memoized).
+
+    The fetch runs in its own task, a cancelled caller does not cancel it for
+    the others. `close` cancels the fetches still in flight.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        maxbytes: Optional[int] = None,
+        weigh: Callable[[Any], int] = lambda result: 0,
+    ) -> None:
+        self.maxsize: int = maxsize
+        self.maxbytes: Optional[int] = maxbytes
+        self.weigh: Callable[[Any], int] = weigh
+        self.inflight: dict[str, asyncio.Task] = {}
+        self.memo: OrderedDict[str, Any] = OrderedDict()
+        self.weights: dict[str, int] = {}
+        self.bytes: int = 0
+        self.shared: int = 0
+        self.memo_hits: int = 0
+
+    async def do(self, url: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        key: str = canonical_url(url)
+        if key in self.memo:
+            self.memo.move_to_end(key)
+            self.memo_hits += 1
+            return self.memo[key]
+        if key in self.inflight:
+            self.shared += 1
+        else:
+            task: asyncio.Task = asyncio.ensure_future(func())
+            task.add_done_callback(lambda task: self._done(key, task))
+            self.inflight[key] = task
+        return await asyncio.shield(self.inflight[key])
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        self.inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None or not task.result():
+            return
+        weight: int = self.weigh(task.result())
+        if self.maxsize <= 0 or (self.maxbytes is not None and weight > self.maxbytes):
+            return
+        self._forget(key)
+        self.memo[key] = task.result()
+        self.weights[key] = weight
+        self.bytes += weight
+        while len(self.memo) > self.maxsize or (
+            self.maxbytes is not None and self.bytes > self.maxbytes
+        ):
+            self._forget(next(iter(self.memo)))
+
+    def _forget(self, key: str) -> None:
+        if self.memo.pop(key, None) is not None:
+            self.bytes -= self.weights.pop(key)
+
+    async def close(self) -> None:
+        """Cancels the fetches in flight and waits for them to finish."""
+        tasks: list[asyncio.Task] = list(self.inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.inflight.clear()
+
+    def clear(self) -> None:
+        """Forgets the memo, the fetches in flight keep being shared."""
+        self.memo.clear()
+        self.weights.clear()
+        self.bytes = 0
+        self.shared = 0
+        self.memo_hits = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return dict(
+            shared=self.shared,
+            memo_hits=self.memo_hits,
+            memo=len(self.memo),
+            memo_bytes=self.bytes,
+        )
@@ -1,5 +1,3 @@
-
-import json
 from logging import Logger
 from pathlib import Path
 from typing import Optional, Union
@@ -8,8 +6,11 @@ from bs4 import BeautifulSoup, NavigableString, ResultSet, Tag
 from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.remote.webelement import WebElement
 
+from interface.backend import codec
 from interface.backend.logger import logdef
 
+from .parsing import soup_features
+
 log: Logger = logdef(__name__)
 
 def read_from_file(filepath: Path, parser: str) -> BeautifulSoup:
@@ -27,7 +28,7 @@ def write_to_file(filepath: Path, data: Union[str, dict], data_format: str = "te
         if data_format == "json":
             # If data is a dictionary, convert it to a JSON-formatted string
             if isinstance(data, dict):
-                data = json.dumps(data, indent=4)
+                data = codec.dumps(data, indent=True).decode()
 
             # Write the JSON content to the file
             with path.open(mode="w", encoding="utf-8") as file:
@@ -52,9 +53,15 @@ def soup(
     source: Union[
         BeautifulSoup, NavigableString, ResultSet, Tag, WebElement, WebDriver, str, Path
     ],
-    parser="html.parser",
-    filepath: Optional[Path | str] = "temp.html",
+    parser: Optional[str] = None,
+    filepath: Optional[Path | str] = None,
 ) -> BeautifulSoup:
+    """
+    Builds a BeautifulSoup tree of `source` with the fastest installed parser
+    (see parsing.get_parser), or `parser` when given. The tree is written,
+    prettified, to `filepath` only when one is given.
+    """
+    parser = soup_features(parser)
     soupen = None
 
     if isinstance(source, (BeautifulSoup, NavigableString, ResultSet, Tag)):
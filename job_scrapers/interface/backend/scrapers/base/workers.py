@@ -0,0 +1,37 @@
+import asyncio
+import multiprocessing
+from logging import Logger
+from typing import Any, Dict
+
+from interface.backend.logger import logdef
+
+log: Logger = logdef(__name__)
+
+
+def run_worker(scraper_cls, scraper_kwds: Dict[str, Any], name: str, workers: int):
+    scraper = scraper_cls(**scraper_kwds)
+    owner: str = scraper.as_worker(name, workers)
+    log.info("Worker %s started", owner)
+    asyncio.run(scraper.work(owner))
+
+
+def launch_workers(scraper_cls, scraper_kwds: Dict[str, Any], workers: int) -> list:
+    """
+    Runs `workers` processes of `scraper_cls(**scraper_kwds).work` until the
+    work queue is drained and returns their exit codes. Processes are spawned,
+    so each one sets up its own event loop, db engine and connection pool.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    processes: list = [
+        ctx.Process(
+            target=run_worker,
+            args=(scraper_cls, scraper_kwds, f"worker-{idx}", workers),
+            name=f"worker-{idx}",
+        )
+        for idx in range(1, workers + 1)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return [process.exitcode for process in processes]
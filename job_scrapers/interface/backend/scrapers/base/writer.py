@@ -0,0 +1,66 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from logging import Logger
+from typing import Any, Optional
+
+from interface.backend.logger import logdef
+
+from .archive import SegmentArchive
+
+log: Logger = logdef(__name__)
+
+
+class BackgroundWriter:
+    """
+    Moves archive writes off the event loop: records go through a bounded
+    asyncio queue to a single writer thread, which keeps the write order.
+    `submit` waits while the queue is full (backpressure) and `close`
+    returns only once every queued record is written and flushed.
+    """
+
+    def __init__(self, archive: SegmentArchive, maxsize: int = 256) -> None:
+        self.archive: SegmentArchive = archive
+        self.maxsize: int = maxsize
+        self.queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self.queue = asyncio.Queue(self.maxsize)
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="archive-writer"
+            )
+            self._task = asyncio.create_task(self._consume())
+
+    async def submit(self, key: str, data: Any) -> None:
+        self.start()
+        await self.queue.put((key, data))
+
+    async def _consume(self) -> None:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        while True:
+            key, data = await self.queue.get()
+            try:
+                await loop.run_in_executor(self._executor, self.archive.write, key, data)
+            except Exception as e:
+                log.error("Failed to archive %s: %s", key, e)
+            finally:
+                self.queue.task_done()
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        await self.queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        await asyncio.get_running_loop().run_in_executor(
+            self._executor, self.archive.flush
+        )
+        self._executor.shutdown(wait=True)
+        self._task = None
+        self._executor = None
+        self.queue = None
@@ -3,7 +3,11 @@ from pprint import pprint
 from typing import Any, Dict, Optional
 from urllib.parse import quote
 
-BASE_API_JOBS_URL: str = "https://www.jobs.ch/api/v1/public/search?"
+from ...config import APISettings, get_api_settings
+
+config: APISettings = get_api_settings()
+
+BASE_API_JOBS_URL: str = f"{config.JOBSCH_API_URL}search?"
 
 
 
@@ -49,6 +53,12 @@ COMPANY_SEGMENTS_DICT: dict[str, Any] = {
     "options": {"small and medium": "kmu", "large": "gu", "consultants": "pdl"},
 }
 
+SORT_DICT: dict[str, Any] = {
+    "api_field": "sort",
+    "domain_field": "sort",
+    "options": {"date": "date", "relevance": "relevance"},
+}
+
 
 class QueryBuilder:
     def __init__(
@@ -61,7 +71,10 @@ class QueryBuilder:
         languages: Optional[list[str]] = None,
         employment_types: Optional[list[str]] = None,
         company_types: Optional[list[str]] = None,
+        sort: Optional[str] = None,
         page: int = 1,
+        rows: int = 20,
+        date_window: Optional[list[int]] = None,
     ) -> None:
         self.query: Optional[str] = query
         self.location: Optional[str] = location
@@ -81,7 +94,11 @@ class QueryBuilder:
         self.company_types: Optional[list[str]] = (
             [f"{x}" for x in company_types] if company_types else company_types
         )
+        self.sort: Optional[str] = sort
         self.page: int = page
+        self.rows: int = rows
+        # [since, until] days ago, narrows the publication dates down further than days
+        self.date_window: Optional[list[int]] = date_window
         self.current_api_url: Optional[str] = BASE_API_JOBS_URL
         self.current_url: Optional[str] = BASE_URL_JOBS
         self.params: dict[str, list] = {"api": [], "domain": []}
@@ -96,6 +113,7 @@ class QueryBuilder:
         self.add_languages()
         self.add_employment_type()
         self.add_company_segments()
+        self.add_sort()
         self.add_page()
         self.build_urls()
 
@@ -118,9 +136,13 @@ class QueryBuilder:
             self.param_handle("page", str(self.page))
 
     def add_dates(self) -> None:
-        if self.days:
-            for k, v in self.generate_dates(self.days).items():
+        if self.date_window:
+            for k, v in self.generate_dates(*self.date_window).items():
                 self.param_handle(k, v, kind=["api"])
+        if self.days:
+            if not self.date_window:
+                for k, v in self.generate_dates(self.days).items():
+                    self.param_handle(k, v, kind=["api"])
             self.param_handle("publication-date", str(self.days), kind=["domain"])
 
     def add_positions(self) -> None:
@@ -143,6 +165,10 @@ class QueryBuilder:
         if self.company_types:
             self.param_handle_dict(COMPANY_SEGMENTS_DICT, self.company_types)
 
+    def add_sort(self) -> None:
+        if self.sort:
+            self.param_handle_dict(SORT_DICT, [self.sort])
+
     def param_handle(self, param, value, kind=None) -> None:
         if kind is None:
             kind: list[str] = ["api", "domain"]
@@ -160,7 +186,7 @@ class QueryBuilder:
         api_params: str = self.custom_urlencode(self.params["api"])
         domain_params: str = self.custom_urlencode(self.params["domain"])
 
-        self.url_api: str = f"{BASE_API_JOBS_URL}{api_params}&rows=20"
+        self.url_api: str = f"{BASE_API_JOBS_URL}{api_params}&rows={self.rows}"
         self.url_domain: str = f"{BASE_URL_JOBS}{domain_params}"
 
     @staticmethod
@@ -176,15 +202,18 @@ class QueryBuilder:
         return {key: dictionary[key] for key in key_list if key in dictionary}
 
     @staticmethod
-    def generate_dates(days: int) -> Dict[str, Any]:
+    def generate_dates(days: int, until: int = 0) -> Dict[str, Any]:
         # Get the current datetime
         now: datetime = datetime.now()
 
         # Subtract the number of days to get the "from" date, and set the time to 00:00:00
         from_date: datetime = (now - timedelta(days=days)).replace(hour=0, minute=0, second=0)
 
-        # Set the "to" datetime to the current day's end, i.e., 23:59:59
+        # Set the "to" datetime to the current day's end, i.e., 23:59:59, or to the
+        # end of the day before `until` days ago, so that adjacent windows are disjoint
         to_date: datetime = now.replace(hour=23, minute=59, second=59)
+        if until:
+            to_date = (now - timedelta(days=until + 1)).replace(hour=23, minute=59, second=59)
 
         # Format the dates into strings
         from_str: str = quote(from_date.strftime("%Y-%m-%d %H:%M:%S"))
@@ -1,19 +1,34 @@
 from logging import Logger
-from typing import Dict
+from typing import Any, AsyncIterator, Dict, Optional
 
 from ... import db
+from ...config import APISettings, get_api_settings
 from ...logger import logdef
 from ..base import BaseScraper
 from . import QueryBuilder
+from .QueryBuilder import COMPANY_SEGMENTS_DICT
 
 log: Logger = logdef(__name__)
 
-BASE_API_JOB_URL: str = "https://www.jobs.ch/api/v1/public/search/job/"
+config: APISettings = get_api_settings()
+
+BASE_API_JOB_URL: str = f"{config.JOBSCH_API_URL}search/job/"
 
 BASE_API_JOB_URL_VAR: str = BASE_API_JOB_URL + "{job_id}"
 
 
 class Scraper(BaseScraper):
+    INCREMENTAL_QUERY_PARAMS: Dict[str, Any] = {"sort": "date"}
+    PAGE_SIZE_PARAM: Optional[str] = "rows"
+    # a job has a single company segment but several employment types, whose
+    # partitions would overlap
+    PARTITION_FACETS: Dict[str, list[str]] = {
+        "company_types": list(COMPANY_SEGMENTS_DICT["options"]),
+    }
+    DATE_WINDOW_PARAM: Optional[str] = "date_window"
+    JOB_COMPANY_FIELD: Optional[str] = "company_name"
+    JOB_PAID_FIELD: Optional[str] = "is_paid"
+
     def __init__(
         self, headers: Dict[str, str], cookies: Dict[str, str], site_name="jobsch"
     ) -> None:
@@ -86,11 +101,36 @@ class Scraper(BaseScraper):
     def extract_job_dict_from_sub_request(self, sub_request_data):
         return sub_request_data.get("data", {}).get("documents", [])
 
-    async def get_uncompleted_jobs(self):
-        conditions = [("status", "is", None), ("url_en", "not_is", None)]
-        return await db.get_records(db.models.jobsch.Job, conditions, "and")
+    def iter_uncompleted_jobs(
+        self, request_id: Optional[int] = None, ids: Optional[list[int]] = None
+    ) -> AsyncIterator[list]:
+        # expired postings are not worth a detail request
+        conditions = [
+            ("status", "is", None),
+            ("url_en", "not_is", None),
+            ("expired", "not_is", 1),
+        ]
+        if request_id is not None:
+            conditions.append(("request_id", "==", request_id))
+        if ids is not None:
+            conditions.append(("id", "in", ids))
+        return db.iter_records(
+            db.models.jobsch.Job,
+            conditions,
+            "and",
+            chunk_size=config.SCRAPER_RECORD_CHUNK_SIZE,
+        )
+
+    async def get_preferred_companies(self) -> set:
+        return {
+            job.company_name
+            for job in await db.get_records(
+                db.models.jobsch.Job, [("saved", "==", 1), ("liked", "==", 1)], "or"
+            )
+            if job.company_name
+        }
 
-    async def main(self, query_list):
+    async def main(self, query_list, incremental: Optional[bool] = None):
         return await super().main(
             query_list,
             querybuilder=QueryBuilder,
@@ -98,4 +138,36 @@ class Scraper(BaseScraper):
             sub_request_model=db.models.jobsch.Sub_Request,
             job_model=db.models.jobsch.Job,
             job_id="job_id",
+            incremental=incremental,
+        )
+
+    async def resume(self):
+        return await super().resume(
+            request_model=db.models.jobsch.Request,
+            sub_request_model=db.models.jobsch.Sub_Request,
+            job_model=db.models.jobsch.Job,
+            job_id="job_id",
+            querybuilder=QueryBuilder,
+        )
+
+    async def distribute(self, query_list, workers: Optional[int] = None):
+        return await super().distribute(
+            query_list,
+            querybuilder=QueryBuilder,
+            request_model=db.models.jobsch.Request,
+            sub_request_model=db.models.jobsch.Sub_Request,
+            job_model=db.models.jobsch.Job,
+            job_id="job_id",
+            task_model=db.models.queue.Task,
+            workers=workers,
+        )
+
+    async def work(self, owner: str):
+        return await super().work(
+            owner,
+            request_model=db.models.jobsch.Request,
+            sub_request_model=db.models.jobsch.Sub_Request,
+            job_model=db.models.jobsch.Job,
+            job_id="job_id",
+            task_model=db.models.queue.Task,
         )
@@ -1,4 +1,5 @@
 import asyncio
+import sys
 from logging import Logger
 
 from interface.backend import scrapers as scrp
@@ -24,8 +25,14 @@ if __name__ == "__main__":
     ]
     SCRPR = scrp.jobsch.Scraper({}, {})
 
-    asyncio.run(
-        SCRPR.main(
-            query_list=query_list,
+    if "--resume" in sys.argv:
+        asyncio.run(SCRPR.resume())
+    elif "--workers" in sys.argv:
+        workers = int(sys.argv[sys.argv.index("--workers") + 1])
+        asyncio.run(SCRPR.distribute(query_list=query_list, workers=workers))
+    else:
+        asyncio.run(
+            SCRPR.main(
+                query_list=query_list,
+            )
         )
-    )